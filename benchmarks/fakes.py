@@ -0,0 +1,237 @@
+"""In-memory stand-ins for Gemini and Supabase used by the offline benchmarks.
+
+Both fakes count the calls made and the bytes moved so scenarios can report them.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+FILLER = "Mitochondria are membrane-bound organelles that generate most of the cell's chemical energy. "
+
+
+class Metrics:
+    """Thread-safe call and byte counters shared by the fakes."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+metrics = Metrics()
+
+
+def fake_answer(prompt, output_chars):
+    """Builds a plausible response in whatever format the prompt asks for."""
+    # Tag output with the prompt so different document sections yield distinct items
+    tag = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    quiz = re.search(r"Create a (\d+)-question multiple-choice quiz", prompt)
+    if quiz:
+        return "\n\n".join(
+            f"Q: Sample question {i + 1} ({tag})?\nA) First\nB) Second\nC) Third\nD) Fourth\nCorrect: B"
+            for i in range(int(quiz.group(1)))
+        )
+    if prompt.startswith("Create flashcards"):
+        cards = max(1, output_chars // 120)
+        return "\n\n".join(
+            f"**Question {i + 1}:** What is term {i + 1} ({tag})?\n**Answer:** Definition {i + 1}."
+            for i in range(cards)
+        )
+    return (FILLER * (output_chars // len(FILLER) + 1))[:output_chars]
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Iterable of response chunks, delivered with the model's latency spread across them."""
+
+    def __init__(self, text, latency, chunk_chars=200):
+        self.chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or [""]
+        self.delay = latency / len(self.chunks)
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield FakeResponse(chunk)
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream=False, **kwargs):
+        response = self.model.generate_content(message, stream=stream, **kwargs)
+        self.history.append({"role": "user", "parts": [message]})
+        return response
+
+
+class FakeGenerativeModel:
+    """Mimics google.generativeai.GenerativeModel with configurable latency and output size."""
+
+    def __init__(self, model_name="gemini-1.5-flash", latency=0.5, output_chars=2000):
+        self.model_name = f"models/{model_name}"
+        self.latency = latency
+        self.output_chars = output_chars
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        metrics.add("model_calls")
+        metrics.add("model_bytes_sent", len(prompt.encode("utf-8")))
+        text = fake_answer(prompt, self.output_chars)
+        metrics.add("model_bytes_received", len(text.encode("utf-8")))
+        if stream:
+            return FakeStream(text, self.latency)
+        time.sleep(self.latency)
+        return FakeResponse(text)
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+class FakeBucket:
+    def __init__(self, store):
+        self.store = store
+
+    def upload(self, path, file, file_options=None):
+        metrics.add("storage_calls")
+        metrics.add("storage_bytes_up", len(file))
+        self.store[path] = bytes(file)
+        return SimpleNamespace(path=path)
+
+    def download(self, path):
+        metrics.add("storage_calls")
+        if path not in self.store:
+            raise FileNotFoundError(path)
+        metrics.add("storage_bytes_down", len(self.store[path]))
+        return self.store[path]
+
+    def list(self, folder):
+        metrics.add("storage_calls")
+        return [{"name": path[len(folder):]} for path in self.store if path.startswith(folder)]
+
+    def remove(self, paths):
+        metrics.add("storage_calls")
+        return [{"name": path} for path in paths if self.store.pop(path, None) is not None]
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects = {}
+
+    def from_(self, bucket_name):
+        return FakeBucket(self.objects.setdefault(bucket_name, {}))
+
+
+class FakeQuery:
+    """Chainable subset of the PostgREST query builder over a list of dict rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.order_by = None
+        self.row_limit = None
+        self.row_offset = 0
+        self.write = None
+
+    def select(self, *columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, lambda cell: cell == value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append((column, lambda cell: cell is not None and cell < value))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count):
+        self.row_limit = count
+        return self
+
+    def range(self, start, end):
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def insert(self, row):
+        self.write = ("insert", row if isinstance(row, list) else [row])
+        return self
+
+    def upsert(self, row, on_conflict=None, ignore_duplicates=False):
+        self.write = ("upsert", row if isinstance(row, list) else [row], on_conflict, ignore_duplicates)
+        return self
+
+    def execute(self):
+        metrics.add("table_calls")
+        if self.write:
+            rows = self.write[1]
+            if self.write[0] == "upsert" and self.write[2]:
+                keys = self.write[2].split(",")
+                if self.write[3]:
+                    rows = [row for row in rows
+                            if all(any(r.get(k) != row.get(k) for k in keys) for r in self.rows)]
+                for row in rows:
+                    self.rows[:] = [r for r in self.rows if any(r.get(k) != row.get(k) for k in keys)]
+            self.rows.extend(dict(row) for row in rows)
+            return SimpleNamespace(data=rows)
+
+        data = [row for row in self.rows if all(test(row.get(c)) for c, test in self.filters)]
+        if self.order_by:
+            data.sort(key=lambda row: row.get(self.order_by[0]), reverse=self.order_by[1])
+        if self.row_limit is not None:
+            data = data[self.row_offset:self.row_offset + self.row_limit]
+        return SimpleNamespace(data=data)
+
+
+class FakeAuth:
+    def __init__(self):
+        self.users = {}
+        self.current = None
+
+    def sign_up(self, credentials):
+        metrics.add("auth_calls")
+        user = SimpleNamespace(email=credentials["email"],
+                               user_metadata=credentials.get("options", {}).get("data", {}))
+        self.users[credentials["email"]] = (credentials["password"], user)
+        return SimpleNamespace(user=user)
+
+    def sign_in_with_password(self, credentials):
+        metrics.add("auth_calls")
+        password, user = self.users.get(credentials["email"], (None, None))
+        if password != credentials["password"]:
+            raise ValueError("Invalid login credentials")
+        self.current = user
+        return SimpleNamespace(user=user)
+
+    def get_user(self):
+        metrics.add("auth_calls")
+        return SimpleNamespace(user=self.current) if self.current else None
+
+
+class FakeSupabase:
+    """Mimics the parts of supabase.Client the app uses: storage, tables and auth."""
+
+    def __init__(self):
+        self.storage = FakeStorage()
+        self.auth = FakeAuth()
+        self.tables = {}
+
+    def table(self, name):
+        return FakeQuery(self.tables.setdefault(name, []))
@@ -0,0 +1,108 @@
+"""Benchmarks DOCX export of enhanced notes over large markdown inputs.
+
+Compares the in-memory exporter against the previous approach of writing the
+document to disk (recompiling the inline pattern per line) and reading it back.
+Run from the repository root:
+
+    python benchmarks/notes_export.py [--lines 500 2000 8000] [--repeat 3]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx_export import build_docx, create_docx  # noqa: E402
+
+SAMPLE_BLOCK = [
+    "# Chapter heading",
+    "## Section heading",
+    "Plain paragraph with **bold terms** and *italic asides* mixed into ordinary sentences.",
+    "- Bullet point about a key concept",
+    "* Another bullet with **emphasis**",
+    "1. First numbered step",
+    "2. Second numbered step",
+    "",
+    "### Subsection",
+    "A longer explanatory paragraph that goes on for a while to resemble real notes, "
+    "with *several* **formatted** *segments* along the way.",
+]
+
+
+def make_notes(lines):
+    """Builds markdown notes of roughly the given number of lines."""
+    return "\n".join(SAMPLE_BLOCK[i % len(SAMPLE_BLOCK)] for i in range(lines))
+
+
+def legacy_export(text, path):
+    """The previous exporter: per-line regex compilation and a round trip through disk."""
+    from docx import Document
+
+    doc = Document()
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            doc.add_paragraph("")
+            continue
+        if line.startswith("# "):
+            doc.add_heading(line[2:], level=1)
+            continue
+        elif line.startswith("## "):
+            doc.add_heading(line[3:], level=2)
+            continue
+        elif line.startswith("### "):
+            doc.add_heading(line[4:], level=3)
+            continue
+        elif line.startswith(("- ", "* ")):
+            doc.add_paragraph(line[2:], style="ListBullet")
+            continue
+        elif re.match(r"^\d+\.\s", line):
+            doc.add_paragraph(line, style="ListNumber")
+            continue
+        para = doc.add_paragraph()
+        pattern = re.compile(r"(\*\*.*?\*\*|\*.*?\*)")
+        for part in pattern.split(line):
+            if part.startswith("**") and part.endswith("**"):
+                para.add_run(part[2:-2]).bold = True
+            elif part.startswith("*") and part.endswith("*"):
+                para.add_run(part[1:-1]).italic = True
+            else:
+                para.add_run(part)
+    doc.save(path)
+    with open(path, "rb") as docx_file:
+        return docx_file.read()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "Enhanced_Notes.docx")
+    print(f"{'lines':>7} {'legacy (ms)':>12} {'in-memory (ms)':>15} {'cached (ms)':>12} {'size (KB)':>10}")
+    for lines in args.lines:
+        notes = make_notes(lines)
+        legacy = timed(lambda: legacy_export(notes, path), args.repeat)
+        in_memory = timed(lambda: build_docx(notes), args.repeat)
+        create_docx(notes)  # Warm the export cache
+        cached = timed(lambda: create_docx(notes), args.repeat)
+        size = len(create_docx(notes)) / 1024
+        print(f"{lines:>7} {legacy * 1000:>12.1f} {in_memory * 1000:>15.1f} {cached * 1000:>12.3f} {size:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Offline page benchmarks driven through Streamlit's AppTest harness.
+
+Gemini and Supabase are replaced by the in-memory fakes in benchmarks/fakes.py,
+so no credentials or network are needed. For each scenario this reports wall
+time, the number and latency of script runs, model and Supabase calls, bytes
+moved and peak Python memory. Run from
+the repository root:
+
+    python benchmarks/pages.py [--latency 0.5] [--output-chars 2000] [--doc-words 20000] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep every on-disk cache out of the working tree and start cold
+_cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+os.environ.setdefault("GEN_CACHE_DB", os.path.join(_cache_dir, "generations.sqlite3"))
+os.environ.setdefault("TEXT_CACHE_DIR", os.path.join(_cache_dir, "extracted-text"))
+os.environ.setdefault("JOB_POLL_INTERVAL", "0.05")
+
+import logging  # noqa: E402
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import database  # noqa: E402
+import document_store  # noqa: E402
+import gemini  # noqa: E402
+from fakes import FakeGenerativeModel, FakeSupabase, FILLER, metrics  # noqa: E402
+
+# AppTest sets session state outside a script run, which Streamlit warns about every time
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+MAIN = os.path.join(ROOT, "main.py")
+USER = "student"
+CHAT = "Biology"
+DOCUMENT = "syllabus.txt"
+
+
+def install_fakes(latency, output_chars, doc_words):
+    """Points the app's shared clients at the fakes and seeds one user's chat and document."""
+    fake = FakeSupabase()
+    words = FILLER.split()
+    # Number each paragraph so every part of the document is distinct
+    document = " ".join(
+        f"{words[i % len(words)]}\n\nParagraph {i // 100}." if i % 100 == 99 else words[i % len(words)]
+        for i in range(doc_words)
+    )
+    fake.storage.from_("user-documents").upload(f"{USER}/{CHAT}/{DOCUMENT}", document.encode("utf-8"))
+    fake.table("Chat-History").insert({"id": "ID0001", "name": CHAT, "displayname": USER}).execute()
+
+    database._client = fake
+    for model_name in ("gemini-1.5-flash", "gemini-1.5-pro"):
+        gemini._models[model_name] = FakeGenerativeModel(model_name, latency, output_chars)
+    return document
+
+
+run_times = []
+_apptest_run = AppTest._run
+
+
+def _timed_run(self, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        return _apptest_run(self, *args, **kwargs)
+    finally:
+        run_times.append(time.perf_counter() - start)
+
+
+# Both AppTest.run() and widget .run() calls end up here, once per simulated interaction
+AppTest._run = _timed_run
+
+
+def app(page="home", document=None, timeout=120):
+    """Returns an AppTest for main.py with a logged-in session on the given page."""
+    at = AppTest.from_file(MAIN, default_timeout=timeout)
+    if page != "anonymous":
+        at.session_state["user_logged_in"] = True
+        at.session_state["username"] = USER
+        at.session_state["page"] = page
+    if document is not None:
+        at.session_state[document_store.SESSION_KEY] = document_store.document_store.put(document)
+    return at
+
+
+def button(at, label):
+    return next(widget for widget in at.button if widget.label == label)
+
+
+def wait_until(at, finished, timeout=120):
+    """Reruns the app, as the job progress fragment's polling would, until `finished(at)`."""
+    deadline = time.perf_counter() + timeout
+    while not finished(at):
+        if time.perf_counter() > deadline:
+            raise TimeoutError("background job did not finish")
+        time.sleep(float(os.environ["JOB_POLL_INTERVAL"]))
+        at.run()
+
+
+def scenario_login_screen(document):
+    app("anonymous").run()
+
+
+def scenario_sidebar_rerun(document):
+    at = app()
+    at.run()
+    at.run()  # A plain widget-interaction rerun
+
+
+def scenario_load_documents(document):
+    at = app()
+    at.session_state["documents"] = [DOCUMENT]
+    at.run()
+    at.sidebar.selectbox[0].set_value(CHAT).run()
+    at.sidebar.multiselect[0].set_value([DOCUMENT]).run()
+    button(at, "📂 Load").click().run()
+
+
+def scenario_chatbot_question(document):
+    at = app(document=document)
+    at.run()
+    at.chat_input[0].set_value("What do mitochondria generate?").run()
+
+
+def scenario_quiz(document):
+    at = app("quiz", document)
+    at.run()
+    button(at, "Generate Quiz").click().run()
+    wait_until(at, lambda at: at.session_state["quiz_stream"].done)
+
+
+def scenario_flashcards(document):
+    at = app("flashcard", document)
+    at.run()
+    wait_until(at, lambda at: not at.get("progress"))
+
+
+def scenario_notes(document):
+    at = app("notes", document)
+    at.run()
+    button(at, "🧠 Enhance Notes").click().run()
+    wait_until(at, lambda at: "enhanced_notes" in at.session_state)
+
+
+SCENARIOS = {
+    "login screen": scenario_login_screen,
+    "sidebar rerun": scenario_sidebar_rerun,
+    "load documents": scenario_load_documents,
+    "chatbot question": scenario_chatbot_question,
+    "quiz": scenario_quiz,
+    "flashcards": scenario_flashcards,
+    "notes": scenario_notes,
+}
+
+
+def run_scenario(name, document):
+    metrics.reset()
+    run_times.clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    error = None
+    try:
+        SCENARIOS[name](document)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts = metrics.counts
+    return {
+        "scenario": name,
+        "seconds": round(elapsed, 3),
+        "runs": len(run_times),
+        "last_run_seconds": round(run_times[-1], 3) if run_times else None,
+        "model_calls": counts["model_calls"],
+        "supabase_calls": counts["storage_calls"] + counts["table_calls"] + counts["auth_calls"],
+        "bytes_moved": sum(counts[key] for key in counts if "bytes" in key),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model latency per call (s)")
+    parser.add_argument("--output-chars", type=int, default=2000, help="fake model output size")
+    parser.add_argument("--doc-words", type=int, default=20000, help="size of the seeded document")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    args = parser.parse_args()
+
+    document = install_fakes(args.latency, args.output_chars, args.doc_words)
+    results = [run_scenario(name, document) for name in args.scenario or SCENARIOS]
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print(f"{'scenario':<18} {'time (s)':>9} {'runs':>5} {'last run (s)':>13} "
+          f"{'model':>6} {'supabase':>9} {'bytes':>11} {'peak MB':>8}")
+    for result in results:
+        print(f"{result['scenario']:<18} {result['seconds']:>9.3f} {result['runs']:>5} "
+              f"{result['last_run_seconds'] or 0:>13.3f} {result['model_calls']:>6} "
+              f"{result['supabase_calls']:>9} {result['bytes_moved']:>11} {result['peak_mb']:>8.2f}"
+              + (f"  {result['error']}" if result["error"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measures cold-start import cost of each app module.
+
+Every module is imported in a fresh interpreter so shared dependencies are
+counted against each one. Run from the repository root:
+
+    python benchmarks/startup.py [--repeat 5] [--importtime main]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "main",
+    "chatbot",
+    "login",
+    "signup",
+    "notes",
+    "quiz",
+    "flashcards",
+    "database",
+    "gemini",
+    "loader",
+    "retrieval",
+]
+
+TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def time_import(module, repeat):
+    """Returns the median wall time in seconds of importing a module in a fresh interpreter."""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def top_imports(module, limit):
+    """Returns the dependencies with the highest cumulative import time, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # Format: "import time:  <self us> | <cumulative us> | <indented module name>"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--importtime", metavar="MODULE", help="also list the slowest imports under MODULE")
+    parser.add_argument("--limit", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'module':<12} {'import (ms)':>12}")
+    for module in MODULES:
+        try:
+            print(f"{module:<12} {time_import(module, args.repeat) * 1000:>12.1f}")
+        except RuntimeError as e:
+            print(f"{module:<12} {'failed':>12}  {e}")
+
+    if args.importtime:
+        print(f"\nSlowest imports under {args.importtime}:")
+        print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+        for cumulative_us, self_us, name in top_imports(args.importtime, args.limit):
+            print(f"{cumulative_us / 1000:>16.1f} {self_us / 1000:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
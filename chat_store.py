@@ -0,0 +1,138 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from database import supabase_client as supabase
+from telemetry import metrics, span
+
+MESSAGES_TABLE = "Chat-Messages"
+NEW_CHAT_OPTION = "➕ Create New Chat"
+
+PAGE_SIZE = int(os.environ.get("CHAT_PAGE_SIZE", "20"))
+FLUSH_INTERVAL = float(os.environ.get("CHAT_FLUSH_INTERVAL", "2"))
+FLUSH_BATCH = int(os.environ.get("CHAT_FLUSH_BATCH", "50"))
+MAX_PENDING = int(os.environ.get("CHAT_MAX_PENDING", "10000"))
+
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+
+def next_seq():
+    """Returns a sequence number for a new message: microseconds since the epoch, unique in this process.
+
+    Sessions number messages independently, so two tabs on one chat must not count
+    from the same stored row; Chat-Messages is unique on (displayname, chat, seq).
+    """
+    global _last_seq
+    with _seq_lock:
+        _last_seq = max(time.time_ns() // 1000, _last_seq + 1)
+        return _last_seq
+
+
+def message_row(user, chat, seq, role, content):
+    """Builds the Chat-Messages row for one message."""
+    return {
+        "displayname": user,
+        "chat": chat,
+        "seq": seq,
+        "role": role,
+        "content": content,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+
+
+class MessageWriter:
+    """Write-behind buffer that persists chat messages in batched inserts.
+
+    Messages are queued by the script thread and inserted by a background
+    thread every FLUSH_INTERVAL seconds, or sooner once FLUSH_BATCH are queued.
+    Failed batches stay queued and are retried on the next flush.
+    """
+
+    def __init__(self, interval=FLUSH_INTERVAL, batch=FLUSH_BATCH, max_pending=MAX_PENDING):
+        self.interval = interval
+        self.batch = batch
+        self.max_pending = max_pending
+        self._pending = []
+        self._in_flight = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def append(self, row):
+        """Queues a row for insertion."""
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) > self.max_pending:
+                # Supabase has been unreachable for a long time; drop the oldest rather than grow forever
+                del self._pending[0]
+                metrics.inc("chat_messages_dropped_total")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="chat-writer")
+                self._thread.start()
+            if len(self._pending) >= self.batch:
+                self._wake.set()
+
+    def pending(self, user, chat):
+        """Returns queued rows for one chat that have not been inserted yet."""
+        with self._lock:
+            return [row for row in self._in_flight + self._pending
+                    if row["displayname"] == user and row["chat"] == chat]
+
+    def flush(self):
+        """Inserts everything queued so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._in_flight = rows
+            if not rows:
+                return 0
+            with span("persist_messages", rows=len(rows)):
+                try:
+                    for start in range(0, len(rows), self.batch):
+                        # A retried batch may already be stored; the duplicates are skipped
+                        supabase.table(MESSAGES_TABLE).upsert(rows[start:start + self.batch],
+                                                             on_conflict="displayname,chat,seq",
+                                                             ignore_duplicates=True).execute()
+                        with self._lock:
+                            self._in_flight = rows[start + self.batch:]
+                except Exception:
+                    metrics.inc("chat_flush_errors_total")
+                    with self._lock:
+                        self._pending = self._in_flight + self._pending
+                        self._in_flight = []
+                    return 0
+            metrics.inc("chat_messages_persisted_total", len(rows))
+            return len(rows)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+message_writer = MessageWriter()
+atexit.register(message_writer.flush)
+
+
+def load_messages(user, chat, before=None, limit=PAGE_SIZE):
+    """Returns up to `limit` messages of a chat older than sequence `before`, oldest first.
+
+    Messages still waiting in the write-behind buffer are included.
+    """
+    query = (supabase.table(MESSAGES_TABLE).select("seq", "role", "content")
+             .eq("displayname", user).eq("chat", chat))
+    if before is not None:
+        query = query.lt("seq", before)
+    stored = query.order("seq", desc=True).limit(limit).execute().data or []
+
+    rows = {row["seq"]: row for row in stored}
+    for row in message_writer.pending(user, chat):
+        if before is None or row["seq"] < before:
+            rows[row["seq"]] = row
+    newest = sorted(rows)[-limit:]
+    return [{"seq": seq, "role": rows[seq]["role"], "content": rows[seq]["content"]} for seq in newest]
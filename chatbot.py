@@ -1,36 +1,116 @@
+import time
 import streamlit as st
+from retrieval import retrieve_context
+from chat_store import NEW_CHAT_OPTION, PAGE_SIZE, load_messages, message_row, message_writer, next_seq
+from router import REQUEST_TIMEOUT
+from scheduler import send_message
+from history import build_history, new_summary_state, summarize_turns
+from document_store import selected_document_digest
+from semantic_cache import semantic_cache
+from telemetry import span
 
 # Function to communicate with Gemini API
 def chat_with_gemini(question, chat_history, model):
     """Handles chat conversation with Gemini API."""
     chat = model.start_chat(history=chat_history)
-    response = chat.send_message(question)
+    response = send_message(chat, question, deadline=time.monotonic() + REQUEST_TIMEOUT,
+                            request_options={"timeout": REQUEST_TIMEOUT})
     return response.text, chat.history
 
+def stream_chat_with_gemini(question, chat_history, model):
+    """Streams a chat response from Gemini API, yielding text chunks as they arrive."""
+    chat = model.start_chat(history=chat_history)
+    response = send_message(chat, question, stream=True, deadline=time.monotonic() + REQUEST_TIMEOUT,
+                            request_options={"timeout": REQUEST_TIMEOUT})
+    for chunk in response:
+        yield chunk.text
+
 # Function to format chat history for Gemini API
 def adjust_history_for_gemini(history):
-    """Adjusts chat history for Gemini API."""
-    return [{"role": message["role"], "parts": [message["content"]]} for message in history]
+    """Adjusts chat history for Gemini API, keeping it within the token budget."""
+    if "chat_summary" not in st.session_state:
+        st.session_state.chat_summary = new_summary_state()
+    return build_history(history, st.session_state.chat_summary, summarize_turns)
+
+def open_transcript(user, chat):
+    """Loads the newest page of a chat's saved messages whenever the selected chat changes."""
+    transcript = st.session_state.get("transcript")
+    if transcript is not None and transcript["chat"] == chat:
+        return transcript
+
+    messages = []
+    if chat is not None:
+        try:
+            messages = load_messages(user, chat)
+        except Exception as e:
+            st.warning(f"Saved messages could not be loaded: {e}")
+
+    st.session_state.messages = messages
+    st.session_state.chat_summary = new_summary_state()
+    st.session_state.transcript = transcript = {
+        "chat": chat,
+        "persist": chat is not None,
+        "has_earlier": len(messages) == PAGE_SIZE,
+        "visible": PAGE_SIZE,
+    }
+    return transcript
+
+def load_earlier_messages(user, transcript):
+    """Prepends the previous page of saved messages to the session's transcript."""
+    messages = st.session_state.messages
+    earlier = load_messages(user, transcript["chat"], before=messages[0]["seq"])
+    messages[:0] = earlier
+    # Keep the rolling summary pointing at the same messages now that the list has shifted
+    st.session_state.chat_summary["summarized"] += len(earlier)
+    transcript["has_earlier"] = len(earlier) == PAGE_SIZE
+
+def record_message(transcript, role, content):
+    """Appends a message to the session and queues it for write-behind persistence."""
+    seq = next_seq()
+    st.session_state.messages.append({"seq": seq, "role": role, "content": content})
+    if transcript["persist"]:
+        message_writer.append(message_row(st.session_state["username"], transcript["chat"], seq, role, content))
 
 def chatbot_interface(model, document_text):
     """Streamlit-based chatbot interface using Gemini API."""
     st.markdown("## 🤖 Doubt Clearance Chatbot")
 
-    # Initialize chat history in session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Load the selected chat's saved messages, or start a session-only transcript
+    user = st.session_state.get("username")
+    chat = st.session_state.get("selected_chat")
+    transcript = open_transcript(user, None if chat in (None, NEW_CHAT_OPTION) else chat)
 
     # Display document context if available
     if document_text:
         with st.expander("📜 Document Context", expanded=True):
             st.text_area("Loaded Document", document_text, height=200, disabled=True)
 
+    # Only the newest messages are rendered, so reruns cost the same however long the chat gets
+    messages = st.session_state.messages
+    if len(messages) > transcript["visible"] or transcript["has_earlier"]:
+        if st.button("⬆️ Load earlier messages"):
+            transcript["visible"] += PAGE_SIZE
+            if transcript["visible"] > len(messages) and transcript["has_earlier"]:
+                try:
+                    load_earlier_messages(user, transcript)
+                except Exception as e:
+                    st.warning(f"Earlier messages could not be loaded: {e}")
+
     # Display chat messages in a scrollable container
     with st.container():
-        for message in st.session_state.messages:
+        for message in st.session_state.messages[-transcript["visible"]:]:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
+    # Answers to near-identical questions about the same document are shared across sessions
+    opted_out = st.session_state.setdefault("semantic_cache_opt_out", set())
+    reuse_answers = st.toggle("⚡ Reuse answers to similar questions", value=transcript["chat"] not in opted_out,
+                              help="Instantly answers questions other students already asked about this document.")
+    if reuse_answers:
+        opted_out.discard(transcript["chat"])
+    else:
+        opted_out.add(transcript["chat"])
+
     # Fixed input bar at the bottom
     user_input = st.chat_input("Ask a question...")
     
@@ -40,30 +120,51 @@ def chatbot_interface(model, document_text):
             st.markdown(user_input)
 
         # Save user's message to session state
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        record_message(transcript, "user", user_input)
 
         # Generate response using Gemini API
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
             full_response = ""
 
+            document_key = selected_document_digest()
+            cached = semantic_cache.lookup(document_key, user_input) if reuse_answers else None
+            if cached is not None:
+                similar_question, full_response = cached
+                message_placeholder.markdown(full_response)
+                st.caption(f"⚡ Answered from a similar question: \"{similar_question}\"")
+                record_message(transcript, "assistant", full_response)
+                return
+
             try:
                 # Format history and call API
-                formatted_history = adjust_history_for_gemini(st.session_state.messages)
+                # The question itself is sent below, so leave it out of the history
+                formatted_history = adjust_history_for_gemini(st.session_state.messages[:-1])
                 
                 # Include document context in the prompt if available
                 if document_text:
-                    prompt = f"Use the following document to assist with the response:\n\n{document_text}\n\nQuestion: {user_input}"
+                    # Only send the passages relevant to this question, not the whole document
+                    context = retrieve_context(document_text, user_input, digest=document_key)
+                    prompt = f"Use the following document excerpts to assist with the response:\n\n{context}\n\nQuestion: {user_input}"
                 else:
                     prompt = user_input
                 
-                response_text, chat_history = chat_with_gemini(prompt, formatted_history, model)
+                with span("chat_with_gemini") as record:
+                    try:
+                        # Display response dynamically as chunks arrive
+                        for chunk in stream_chat_with_gemini(prompt, formatted_history, model):
+                            full_response += chunk
+                            message_placeholder.markdown(full_response + "▌")
+                    except Exception:
+                        # Fall back to a single blocking request if streaming fails
+                        record["fallback"] = True
+                        full_response, chat_history = chat_with_gemini(prompt, formatted_history, model)
 
-                # Display response dynamically
-                full_response = response_text
                 message_placeholder.markdown(full_response)
 
                 # Save assistant's response to session state
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
+                record_message(transcript, "assistant", full_response)
+                if reuse_answers:
+                    semantic_cache.store(document_key, user_input, full_response)
             except Exception as e:
                 st.error(f"Error in communication with Gemini API: {e}")
@@ -1,9 +1,123 @@
-from supabase import create_client
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 import os
+import threading
+import weakref
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# HTTP transport settings shared by every Supabase request in the process
+REQUEST_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "15"))
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "16"))
+KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+BATCH_WORKERS = int(os.getenv("SUPABASE_BATCH_WORKERS", "8"))
+REMOVE_BATCH_SIZE = 1000  # Storage API limit on paths per remove request
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+_batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="supabase")
+
+
+def _transport_settings():
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_client():
+    """Returns the shared Supabase client, creating it on first use.
+
+    All table, storage and auth calls reuse one pooled keep-alive HTTP connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from supabase import ClientOptions, create_client
+
+            options = ClientOptions(
+                httpx_client=httpx.Client(**_transport_settings()),
+                postgrest_client_timeout=REQUEST_TIMEOUT,
+                storage_client_timeout=REQUEST_TIMEOUT,
+            )
+            _client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+        return _client
+
+
+async def get_async_client():
+    """Returns the async Supabase client for fan-out work, one per event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        import httpx
+        from supabase import AsyncClientOptions, acreate_client
+
+        options = AsyncClientOptions(
+            httpx_client=httpx.AsyncClient(**_transport_settings()),
+            postgrest_client_timeout=REQUEST_TIMEOUT,
+            storage_client_timeout=REQUEST_TIMEOUT,
+        )
+        # httpx.AsyncClient is bound to the loop it was created on
+        _async_clients[loop] = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    return _async_clients[loop]
+
+
+def download_many(bucket_name, file_paths):
+    """Downloads several storage objects concurrently over the pooled client.
+
+    Yields (file_path, data, error) tuples as each download finishes.
+    """
+    bucket = get_client().storage.from_(bucket_name)
+    downloads = {_batch_pool.submit(bucket.download, file_path): file_path for file_path in file_paths}
+    for download in as_completed(downloads):
+        try:
+            yield downloads[download], download.result(), None
+        except Exception as e:
+            yield downloads[download], None, e
+
+
+def remove_many(bucket_name, file_paths):
+    """Removes storage objects using as few requests as the API allows."""
+    bucket = get_client().storage.from_(bucket_name)
+    removed = []
+    for start in range(0, len(file_paths), REMOVE_BATCH_SIZE):
+        removed.extend(bucket.remove(file_paths[start:start + REMOVE_BATCH_SIZE]))
+    return removed
+
+
+async def adownload_many(bucket_name, file_paths, concurrency=BATCH_WORKERS):
+    """Async variant of download_many; returns (file_path, data, error) tuples in input order."""
+    bucket = (await get_async_client()).storage.from_(bucket_name)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def download(file_path):
+        async with slots:
+            try:
+                return file_path, await bucket.download(file_path), None
+            except Exception as e:
+                return file_path, None, e
+
+    return await asyncio.gather(*(download(file_path) for file_path in file_paths))
+
+
+class _LazyClient:
+    """Stands in for the Supabase client until an attribute is first used."""
+
+    def __getattr__(self, name):
+        return getattr(get_client(), name)
+
+
+supabase_client = _LazyClient()
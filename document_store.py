@@ -0,0 +1,172 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import streamlit as st
+
+# Decoded copies kept in memory for fast access, shared by every session
+HOT_BYTES = int(os.environ.get("DOCUMENT_STORE_HOT_BYTES", str(64 * 1024 * 1024)))
+# Total size of stored documents; past this, documents no session references are dropped
+MAX_BYTES = int(os.environ.get("DOCUMENT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+SESSION_KEY = "selected_document"
+
+
+class _Entry:
+    def __init__(self, data):
+        self.size = len(data)
+        self.refs = 0
+        self.mapped = None
+        self.data = None
+        if not data:
+            self.data = b""
+            return
+        try:
+            # Anonymous temp file: the OS pages it in and out and removes it once unmapped
+            with tempfile.TemporaryFile() as spill:
+                spill.write(data)
+                spill.flush()
+                self.mapped = mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.data = data  # No usable temp dir; keep the bytes on the heap instead
+
+    def decode(self):
+        if self.mapped is None:
+            return self.data.decode("utf-8")
+        with memoryview(self.mapped) as view:
+            return str(view, "utf-8")
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+
+class DocumentRef:
+    """A session's handle on a stored document; releasing it is automatic when it is dropped."""
+
+    __slots__ = ("store", "digest", "size", "__weakref__")
+
+    def __init__(self, store, digest, size):
+        self.store = store
+        self.digest = digest
+        self.size = size
+        store._acquire(digest)
+        weakref.finalize(self, store._release, digest)
+
+    def text(self):
+        return self.store.text(self.digest)
+
+
+class DocumentStore:
+    """Process-wide, content-addressed store of loaded document text.
+
+    Each distinct text is held once in a memory-mapped temp file; sessions keep
+    `DocumentRef`s. A bounded LRU of decoded strings sits in front of the maps.
+    """
+
+    def __init__(self, hot_bytes=HOT_BYTES, max_bytes=MAX_BYTES):
+        self.hot_bytes = hot_bytes
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._hot = OrderedDict()
+        self._hot_size = 0
+        self._size = 0
+        # Re-entrant: a reference can be garbage-collected, and released, while the lock is held
+        self._lock = threading.RLock()
+
+    def put(self, text):
+        """Stores `text` (once per distinct content) and returns a reference to it."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest not in self._entries:
+                self._entries[digest] = _Entry(data)
+                self._size += len(data)
+            self._entries.move_to_end(digest)
+            ref = DocumentRef(self, digest, len(data))
+            self._remember(digest, text, len(data))
+            self._evict()
+        return ref
+
+    def text(self, digest):
+        """Returns the text for a digest held by a live reference."""
+        with self._lock:
+            if digest in self._hot:
+                self._hot.move_to_end(digest)
+                return self._hot[digest]
+            entry = self._entries[digest]
+
+        # Safe outside the lock: an entry with live references is never closed
+        text = entry.decode()
+        with self._lock:
+            self._remember(digest, text, entry.size)
+        return text
+
+    def _remember(self, digest, text, size):
+        if size > self.hot_bytes or digest in self._hot:
+            return
+        self._hot[digest] = text
+        self._hot_size += size
+        while self._hot_size > self.hot_bytes:
+            evicted, _ = self._hot.popitem(last=False)
+            self._hot_size -= self._entries[evicted].size
+
+    def _acquire(self, digest):
+        self._entries[digest].refs += 1
+
+    def _release(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self):
+        # Oldest unreferenced documents go first; referenced ones are never dropped
+        for digest in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            entry = self._entries[digest]
+            if entry.refs > 0:
+                continue
+            del self._entries[digest]
+            if digest in self._hot:
+                del self._hot[digest]
+                self._hot_size -= entry.size
+            self._size -= entry.size
+            entry.close()
+
+    def stats(self):
+        """Returns the number of documents and bytes stored and held decoded."""
+        with self._lock:
+            return {
+                "documents": len(self._entries),
+                "bytes": self._size,
+                "hot_bytes": self._hot_size,
+                "references": sum(entry.refs for entry in self._entries.values()),
+            }
+
+
+document_store = DocumentStore()
+
+
+def set_selected_document(text):
+    """Makes `text` the session's loaded document, stored once across sessions."""
+    st.session_state[SESSION_KEY] = document_store.put(text)
+
+
+def selected_document_digest():
+    """Returns the content hash of the session's loaded document, or an empty string."""
+    ref = st.session_state.get(SESSION_KEY)
+    return ref.digest if ref is not None else ""
+
+
+def selected_document_text():
+    """Returns the session's loaded document text, or an empty string if none is loaded."""
+    ref = st.session_state.get(SESSION_KEY)
+    return ref.text() if ref is not None else ""
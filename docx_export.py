@@ -0,0 +1,83 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from telemetry import span
+
+CACHE_ENTRIES = int(os.environ.get("DOCX_CACHE_ENTRIES", "32"))
+
+# Compiled once at import rather than per line
+NUMBERED_PATTERN = re.compile(r"^\d+\.\s")
+INLINE_PATTERN = re.compile(r"(\*\*.*?\*\*|\*.*?\*)")  # Match **bold** and *italic*
+HEADINGS = {"# ": 1, "## ": 2, "### ": 3}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_docx(text):
+    """Renders markdown-style notes into DOCX bytes in memory."""
+    from docx import Document  # python-docx is only needed once notes are exported
+
+    doc = Document()
+    add_paragraph = doc.add_paragraph
+    # Look styles up by name once per document rather than once per paragraph
+    heading_styles = {level: doc.styles[f"Heading {level}"] for level in HEADINGS.values()}
+    bullet_style = doc.styles["List Bullet"]
+    number_style = doc.styles["List Number"]
+
+    for line in text.split("\n"):
+        line = line.strip()
+
+        if not line:
+            add_paragraph("")  # Preserve blank lines
+            continue
+
+        # Headings (Markdown-style)
+        marker, _, rest = line.partition(" ")
+        level = HEADINGS.get(marker + " ") if rest else None
+        if level:
+            add_paragraph(rest, heading_styles[level])
+        # Bullet Points
+        elif line.startswith(("- ", "* ")):
+            add_paragraph(line[2:], bullet_style)
+        # Numbered List
+        elif NUMBERED_PATTERN.match(line):
+            add_paragraph(line, number_style)
+        else:
+            # Handle bold and italic formatting inside paragraphs
+            para = add_paragraph()
+            for part in INLINE_PATTERN.split(line):
+                if not part:
+                    continue
+                if part.startswith("**") and part.endswith("**"):
+                    para.add_run(part[2:-2]).bold = True
+                elif part.startswith("*") and part.endswith("*"):
+                    para.add_run(part[1:-1]).italic = True
+                else:
+                    para.add_run(part)
+
+    output = io.BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def create_docx(text):
+    """Returns DOCX bytes for the notes, reusing the export of identical notes."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+
+    with span("create_docx", chars=len(text)):
+        data = build_docx(text)
+
+    with _cache_lock:
+        _cache[digest] = data
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return data
@@ -1,22 +1,107 @@
 import streamlit as st
+import html
+from datetime import datetime
+from database import supabase_client as supabase
+from document_store import selected_document_digest
+from gen_cache import generation_cache
+from router import generate_content
+from jobs import job_running, session_job, submit_job, wait_for_job
+from mapreduce import map_sections, merge_round_robin, needs_map_reduce, split_sections
+from telemetry import traced
+from review import enroll_cards
 
+FLASHCARD_PROMPT = "Create flashcards for the following text. Provide only question and answer format with question on top and its corresponding aswer below, again next question and answer always keep question at the first:\n{text}"
 
-def generate_flashcards(model,text):
+
+@traced("generate_flashcards")
+def generate_flashcards(model,text,regenerate=False):
     """Generates flashcards using the Gemini API."""
-    response = model.generate_content(f"Create flashcards for the following text. Provide only question and answer format with question on top and its corresponding aswer below, again next question and answer always keep question at the first:\n{text}")
-    return response.text
+    if needs_map_reduce(text):
+        return generate_flashcards_map_reduce(model, text, regenerate)
+    return generate_section_flashcards(model, text, regenerate)
 
-flip_card_html = """
+def generate_section_flashcards(model, text, regenerate=False):
+    """Generates flashcards from a single prompt over the text."""
+    return generation_cache.get_or_generate(
+        model, FLASHCARD_PROMPT, text, None,
+        lambda: generate_content(model, FLASHCARD_PROMPT.format(text=text)).text,
+        refresh=regenerate,
+    )
+
+def generate_flashcards_map_reduce(model, text, regenerate=False):
+    """Generates flashcards per document section concurrently and merges the decks."""
+    section_decks = map_sections(
+        split_sections(text),
+        # Sections go straight to the model; re-entering generate_flashcards would split them again
+        lambda section: parse_flashcards(generate_section_flashcards(model, section, regenerate)),
+    )
+    cards = merge_round_robin(section_decks, key=lambda card: card[0])
+    return "\n".join(f"{front}\n{back}" for front, back in cards)
+
+def parse_flashcards(flashcards):
+    """Parses model output into (front, back) pairs of alternating non-empty lines."""
+    flashcard_lines = [line.strip() for line in flashcards.split('\n') if line.strip()]
+    cards = []
+    for i in range(0, len(flashcard_lines) - 1, 2):
+        front_text = flashcard_lines[i].split("**")[-1].strip()
+        back_text = flashcard_lines[i + 1].split("**")[-1].strip()
+        if front_text and back_text:
+            cards.append((front_text, back_text))
+    return cards
+
+def deck_key():
+    """Identifies the current user's deck for the selected chat and loaded document."""
+    # The document store already holds the content hash, so the text isn't rehashed on every rerun
+    return (st.session_state.get("username"), st.session_state.get("selected_chat"), selected_document_digest())
+
+def load_deck(key):
+    """Returns a stored deck from session state or Supabase, or None if there is none."""
+    decks = st.session_state.setdefault("flashcard_decks", {})
+    if key in decks:
+        return decks[key]
+
+    user_display_name, chat_name, document_hash = key
+    try:
+        response = (supabase.table("Flashcard-Decks").select("cards")
+                    .eq("displayname", user_display_name).eq("chat", chat_name)
+                    .eq("document_hash", document_hash).limit(1).execute())
+    except Exception:
+        return None  # Fall back to generating when the table is unreachable
+
+    if not response.data:
+        return None
+    decks[key] = [tuple(card) for card in response.data[0]["cards"]]
+    return decks[key]
+
+def save_deck(key, cards):
+    """Stores a deck in session state and persists it to Supabase."""
+    st.session_state.setdefault("flashcard_decks", {})[key] = cards
+
+    user_display_name, chat_name, document_hash = key
+    try:
+        supabase.table("Flashcard-Decks").upsert({
+            "displayname": user_display_name,
+            "chat": chat_name,
+            "document_hash": document_hash,
+            "cards": [list(card) for card in cards],
+            "created_at": datetime.utcnow().isoformat(),
+        }, on_conflict="displayname,chat,document_hash").execute()
+    except Exception as e:
+        st.warning(f"Flashcards could not be saved: {e}")
+
+CARDS_PER_PAGE = 12
+
+flip_card_css = """
 <style>
-.flip-card-container {{
+.flip-card-container {
   display: flex;
   flex-wrap: wrap;
   justify-content: space-evenly;
   gap: 20px;
   margin-top: 20px;
-}}
+}
 
-.flip-card {{
+.flip-card {
   background-color: transparent;
   margin: 5px;
   width: 300px;
@@ -24,21 +109,21 @@ flip_card_html = """
   perspective: 1000px;
   border-radius: 10px;
   padding: 10px;
-}}
+}
 
-.flip-card-inner {{
+.flip-card-inner {
   position: relative;
   width: 100%;
   height: 100%;
   transform-style: preserve-3d;
   transition: transform 0.6s;
-}}
+}
 
-.flip-card:hover .flip-card-inner {{
+.flip-card:hover .flip-card-inner {
   transform: rotateY(180deg);
-}}
+}
 
-.flip-card-front, .flip-card-back {{
+.flip-card-front, .flip-card-back {
   position: absolute;
   width: 100%;
   height: 100%;
@@ -48,21 +133,22 @@ flip_card_html = """
   justify-content: center;
   padding: 20px;
   border-radius: 8px;
-}}
+}
 
-.flip-card-front {{
+.flip-card-front {
   background-color: #f0f0f5;
   color: black;
-}}
+}
 
-.flip-card-back {{
+.flip-card-back {
   background-color: #000000;
   color: white;
   transform: rotateY(180deg);
-}}
+}
 </style>
+"""
 
-<div class="flip-card-container">
+flip_card_html = """
   <div class="flip-card">
     <div class="flip-card-inner">
       <div class="flip-card-front">
@@ -73,21 +159,63 @@ flip_card_html = """
       </div>
     </div>
   </div>
-</div>
 """
 
+def render_deck(cards):
+    """Builds one stylesheet and one container holding every given card."""
+    # No blank lines anywhere, so markdown keeps the whole deck as one HTML block
+    card_html = "\n".join(
+        flip_card_html.strip().format(front_text=html.escape(front_text), back_text=html.escape(back_text))
+        for front_text, back_text in cards
+    )
+    return f'{flip_card_css.strip()}\n<div class="flip-card-container">\n{card_html}\n</div>'
+
 def show_flashcards(model,text):
-    flashcards = generate_flashcards(model,text)
-
-    flashcard_lines = flashcards.split('\n')
-    for i in range(0, len(flashcard_lines), 2):
-        card_front = flashcard_lines[i].strip() if i < len(flashcard_lines) else ""
-        card_back = flashcard_lines[i + 1].strip() if i + 1 < len(flashcard_lines) else ""
-        if card_front and card_back:
-            front_text = card_front.split("**")[-1].strip()
-            back_text = card_back.split("**")[-1].strip()
-            card_html = flip_card_html.format(front_text=front_text, back_text=back_text)
-            st.markdown(card_html, unsafe_allow_html=True)
+    if not text:
+        st.warning("⚠️ No document content available. Please upload or select a document.")
+        return
+
+    key = deck_key()
+    cards = load_deck(key)
+    if cards is None and session_job("flashcards") is None:
+        # Generation runs on the job pool so reruns while waiting don't restart it
+        submit_job("flashcards", generate_deck, model, text, key, False)
+
+    if st.button("🔄 Regenerate Flashcards", disabled=job_running("flashcards")):
+        submit_job("flashcards", generate_deck, model, text, key, True)
+        st.rerun()  # Redraw with the button disabled while the job runs
+
+    if cards is not None:
+        enrolled = st.session_state.setdefault("review_enrolled", set())
+        if key not in enrolled:
+            # Stored cards feed the review page, so studying them again needs no model calls
+            enroll_cards("flashcard", cards)
+            enrolled.add(key)
+        render_deck_page(cards)
+
+    job = wait_for_job("flashcards", "Generating flashcards...")
+    if job is not None:
+        if job.error:
+            st.error(f"Error generating flashcards: {job.error}")
+        else:
+            save_deck(*job.result)
+            st.rerun()
+
+def generate_deck(model, text, key, regenerate):
+    """Generates and parses a deck; returns it with the deck key it belongs to."""
+    return key, parse_flashcards(generate_flashcards(model, text, regenerate))
+
+def render_deck_page(cards):
+    """Shows one page of the deck, with a page picker for long decks."""
+    if not cards:
+        st.info("No flashcards could be generated from this document.")
+        return
+
+    # Only the visible page of the deck is sent to the browser, in a single message
+    page_count = (len(cards) + CARDS_PER_PAGE - 1) // CARDS_PER_PAGE
+    page = st.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+    start = (page - 1) * CARDS_PER_PAGE
+    st.markdown(render_deck(cards[start:start + CARDS_PER_PAGE]), unsafe_allow_html=True)
 
 if __name__ == "__main__":
     show_flashcards()
@@ -0,0 +1,23 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name="gemini-1.5-flash"):
+    """Returns a shared GenerativeModel, importing and configuring the SDK on first use."""
+    with _models_lock:
+        if model_name not in _models:
+            import google.generativeai as genai
+
+            if not _models:
+                genai.configure(api_key=GEMINI_API_KEY)
+            _models[model_name] = genai.GenerativeModel(model_name)
+        return _models[model_name]
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+DB_PATH = os.environ.get("GEN_CACHE_DB", os.path.join(".cache", "generations.sqlite3"))
+MEMORY_ENTRIES = int(os.environ.get("GEN_CACHE_MEMORY_ENTRIES", "256"))
+MAX_ROWS = int(os.environ.get("GEN_CACHE_MAX_ROWS", "5000"))
+TTL_SECONDS = int(os.environ.get("GEN_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def model_name(model):
+    """Returns the name of a Gemini model instance, for use in cache keys."""
+    return getattr(model, "model_name", type(model).__name__)
+
+
+def generation_key(model, template, document, params=None):
+    """Hashes model name + prompt template + document hash + parameters into a cache key."""
+    document_hash = hashlib.sha256(document.encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [model_name(model), template, document_hash, params or {}],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """In-process LRU in front of a SQLite store of model generations."""
+
+    def __init__(self, db_path=DB_PATH, max_entries=MEMORY_ENTRIES, max_rows=MAX_ROWS, ttl=TTL_SECONDS):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.stats = Counter()
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS generations_accessed ON generations (accessed)")
+        return self._db
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Returns a cached generation, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            if key in self._memory:
+                value, created = self._memory[key]
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            try:
+                db = self._connect()
+                row = db.execute("SELECT value, created FROM generations WHERE key = ?", (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    db.execute("UPDATE generations SET accessed = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+            except sqlite3.Error:
+                self.stats["errors"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, value):
+        """Stores a generation and evicts expired and least-recently-used rows."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            try:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?)", (key, value, now, now))
+                db.execute("DELETE FROM generations WHERE created < ?", (now - self.ttl,))
+                db.execute(
+                    "DELETE FROM generations WHERE key IN "
+                    "(SELECT key FROM generations ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+                db.commit()
+            except sqlite3.Error:
+                self.stats["errors"] += 1
+
+    def get_or_generate(self, model, template, document, params, generate, refresh=False):
+        """Returns the cached output for these inputs, calling `generate()` on a miss.
+
+        With `refresh`, the cached entry is ignored and replaced by a fresh generation.
+        """
+        key = generation_key(model, template, document, params)
+        value = None if refresh else self.get(key)
+        if value is None:
+            value = generate()
+            if value:
+                self.put(key, value)
+        return value
+
+
+generation_cache = GenerationCache()
@@ -0,0 +1,84 @@
+import os
+
+from router import choose_model, generate_content
+
+TOKEN_BUDGET = int(os.environ.get("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+SUMMARY_TOKENS = int(os.environ.get("CHAT_SUMMARY_TOKEN_BUDGET", "500"))
+MAX_RECENT_MESSAGES = int(os.environ.get("CHAT_RECENT_MESSAGES", "12"))
+
+# Gemini only accepts "user" and "model" roles
+GEMINI_ROLES = {"user": "user", "assistant": "model", "model": "model"}
+
+
+def estimate_tokens(text):
+    """Roughly estimates the token count of a string (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def new_summary_state():
+    """Returns an empty rolling-summary state to keep in session state."""
+    return {"summary": "", "summarized": 0}
+
+
+def summarize_turns(summary, messages):
+    """Folds older chat turns into the rolling summary, on the model routed for summaries."""
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    prompt = (
+        f"Update the running summary of a tutoring conversation with the new turns below. "
+        f"Keep key facts, questions and explanations, in under {SUMMARY_TOKENS * 3 // 4} words.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"
+    )
+    try:
+        model = choose_model("summary", len(prompt), SUMMARY_TOKENS * 4)
+        return generate_content(model, prompt).text
+    except Exception:
+        # Keep the tail of the raw transcript rather than failing the user's question
+        return f"{summary}\n{transcript}"[-SUMMARY_TOKENS * 4:]
+
+
+def _window_start(messages, budget, max_recent):
+    """Returns the index where the newest messages fitting the budget begin."""
+    start = len(messages)
+    used = 0
+    while start > 0 and len(messages) - start < max_recent:
+        cost = estimate_tokens(messages[start - 1]["content"])
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+
+    # The verbatim window must open on a user turn
+    while start < len(messages) and messages[start]["role"] != "user":
+        start += 1
+    return start
+
+
+def build_history(messages, state, summarize, token_budget=TOKEN_BUDGET, max_recent=MAX_RECENT_MESSAGES):
+    """Builds Gemini chat history that fits in `token_budget`.
+
+    Recent messages are kept verbatim; anything older is folded into the rolling
+    summary held in `state`, so each message is only summarized once. Messages
+    hold the user's raw question, never the document excerpts sent with it.
+    """
+    pending = messages[state["summarized"]:]
+    budget = token_budget - estimate_tokens(state["summary"])
+
+    keep_from = _window_start(pending, budget, max_recent)
+    if keep_from > 0:
+        # Shrink to half the window when compacting, so the summary is refreshed every
+        # few turns rather than costing an extra model call on every question
+        keep_from = _window_start(pending, budget // 2, max_recent // 2)
+
+    if keep_from > 0:
+        state["summary"] = summarize(state["summary"], pending[:keep_from])
+        state["summarized"] += keep_from
+
+    history = []
+    if state["summary"]:
+        history.append({"role": "user", "parts": [f"Summary of our conversation so far:\n{state['summary']}"]})
+        history.append({"role": "model", "parts": ["Understood, I'll keep that in mind."]})
+    history.extend(
+        {"role": GEMINI_ROLES[message["role"]], "parts": [message["content"]]}
+        for message in pending[keep_from:]
+    )
+    return history
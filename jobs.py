@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "900"))
+MAX_JOBS = int(os.environ.get("JOB_MAX_RETAINED", "500"))
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+
+_current = threading.local()
+
+
+class Job:
+    """A unit of background work and its status."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+
+class JobQueue:
+    """Bounded worker pool that runs jobs and keeps their results for a while."""
+
+    def __init__(self, workers=JOB_WORKERS, result_ttl=RESULT_TTL, max_jobs=MAX_JOBS):
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        _current.job = job
+        try:
+            job.result = fn(*args, **kwargs)
+            job.progress = 1.0
+            job.status = "done"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        finally:
+            _current.job = None
+            job.finished_at = time.monotonic()
+
+    def _prune(self):
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_at > self.result_ttl:
+                del self._jobs[job_id]
+        # Past the cap, drop the oldest finished jobs first
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job.id]
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Queues `fn(*args, **kwargs)` and returns the new job's id."""
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """Returns a job by id, or None once its result is no longer retained."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+job_queue = JobQueue()
+
+
+def report_progress(done, total):
+    """Updates the progress of the job running on the current thread, if any."""
+    job = getattr(_current, "job", None)
+    if job is not None and total:
+        job.progress = min(done / total, 1.0)
+
+
+def submit_job(kind, fn, *args, **kwargs):
+    """Starts a background job and remembers its id in session state under `kind`."""
+    job_id = job_queue.submit(kind, fn, *args, **kwargs)
+    st.session_state.setdefault("jobs", {})[kind] = job_id
+    return job_id
+
+
+def session_job(kind):
+    """Returns this session's latest job of a kind, or None."""
+    job_id = st.session_state.get("jobs", {}).get(kind)
+    return job_queue.get(job_id) if job_id else None
+
+
+def job_running(kind):
+    """Returns True while this session's latest job of a kind is still queued or running."""
+    job = session_job(kind)
+    return job is not None and not job.done
+
+
+def collect_job(kind):
+    """Forgets a finished job and returns it, so its result is only handled once."""
+    job = session_job(kind)
+    if job is not None and job.done:
+        st.session_state["jobs"].pop(kind, None)
+        return job
+    return None
+
+
+def wait_for_job(kind, label):
+    """Shows progress for a running job until it finishes.
+
+    Returns the finished job (and forgets it), or None if there is none or it is
+    still running. Only the progress bar is polled; the page reruns once, when
+    the job is done, and a rerun never restarts the work.
+    """
+    job = session_job(kind)
+    if job is None:
+        st.session_state.get("jobs", {}).pop(kind, None)  # Result expired
+        return None
+    if job.done:
+        return collect_job(kind)
+
+    _job_progress(kind, label)
+    return None
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _job_progress(kind, label):
+    job = session_job(kind)
+    if job is None or job.done:
+        st.rerun()  # A full rerun lets the page pick up the result
+    st.progress(job.progress, text=label)
@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from database import download_many
+from pdf_extract import extract_text_checked, extractor_id
+from text_cache import content_hash, text_cache
+
+EXTRACT_WORKERS = int(os.environ.get("LOAD_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+# Forking the multi-threaded Streamlit server is unsafe, so workers start from a clean process
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Cached with the text of PDFs cut off at PDF_MAX_PAGES or PDF_MAX_BYTES, so cache hits still warn
+TRUNCATED_SUFFIX = "-truncated"
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    """Returns the process pool used for CPU-bound PDF parsing, creating it on first use."""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS,
+                                                mp_context=multiprocessing.get_context(START_METHOD))
+        return _extract_pool
+
+
+def _replace_extract_pool(broken):
+    """Discards a pool whose worker died so the next submission starts a fresh one."""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is broken:
+            _extract_pool = None
+    broken.shutdown(wait=False)
+
+
+def submit_extraction(data):
+    """Starts parsing a PDF on the process pool; returns (pool, future)."""
+    pool = get_extract_pool()
+    try:
+        return pool, pool.submit(extract_text_checked, data, "pymupdf")
+    except BrokenProcessPool:
+        _replace_extract_pool(pool)
+        pool = get_extract_pool()
+        return pool, pool.submit(extract_text_checked, data, "pymupdf")
+
+
+def extraction_result(pool, future, data):
+    """Waits for a parse, retrying once on a fresh pool if a worker crashed."""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _replace_extract_pool(pool)
+        return submit_extraction(data)[1].result()
+
+
+def cached_extraction(digest):
+    """Returns (text, truncated) for an already parsed PDF, or None on a cache miss."""
+    text = text_cache.get(digest, extractor_id("pymupdf"))
+    if text is None:
+        return None
+    return text, text_cache.get(digest, extractor_id("pymupdf") + TRUNCATED_SUFFIX) is not None
+
+
+def cache_extraction(digest, text, truncated):
+    """Stores a parsed PDF's text and whether it was cut off."""
+    if truncated:
+        # Written before the text, so the text is never found without its marker
+        text_cache.put(digest, extractor_id("pymupdf") + TRUNCATED_SUFFIX, "")
+    text_cache.put(digest, extractor_id("pymupdf"), text)
+
+
+def _prepare(name, data):
+    """Returns (text, truncated, pending) for a downloaded file.
+
+    While a PDF is still being parsed, text is None and `pending` is (digest, data, pool, future).
+    """
+    if not name.lower().endswith(".pdf"):  # Handle text-based files normally
+        return data.decode("utf-8"), False, None
+
+    digest = content_hash(data)
+    cached = cached_extraction(digest)
+    if cached is not None:
+        return cached + (None,)
+    return None, None, (digest, data) + submit_extraction(data)
+
+
+def load_documents(bucket_name, folder, file_names):
+    """Downloads and extracts documents concurrently.
+
+    Returns a list of (file_name, text, truncated, error) tuples in the same
+    order as `file_names`; exactly one of text/error is set for each file, and
+    `truncated` is true for PDFs cut off at PDF_MAX_PAGES or PDF_MAX_BYTES.
+    """
+    indexes = {f"{folder}{name}": index for index, name in enumerate(file_names)}
+    prepared = [None] * len(file_names)
+    errors = [None] * len(file_names)
+
+    # Start parsing each file as soon as its download lands, overlapping the remaining downloads
+    for file_path, data, error in download_many(bucket_name, list(indexes)):
+        index = indexes[file_path]
+        if error is not None:
+            errors[index] = error
+            continue
+        try:
+            prepared[index] = _prepare(file_names[index], data)
+        except Exception as e:
+            errors[index] = e
+
+    results = []
+    for name, value, error in zip(file_names, prepared, errors):
+        text, truncated, pending = value or (None, False, None)
+        if pending is not None:
+            digest, data, pool, extraction = pending
+            try:
+                text, truncated = extraction_result(pool, extraction, data)
+                cache_extraction(digest, text, truncated)
+            except Exception as e:
+                text, truncated, error = None, False, e
+        results.append((name, text, truncated, error))
+    return results
+
+
+def warm_text_cache(name, data):
+    """Starts extracting a newly uploaded PDF in the background so a later Load is a cache hit."""
+    if not name.lower().endswith(".pdf"):
+        return
+
+    digest = content_hash(data)
+    if cached_extraction(digest) is not None:
+        return
+
+    def store(extraction):
+        if extraction.exception() is None:
+            cache_extraction(digest, *extraction.result())
+
+    submit_extraction(data)[1].add_done_callback(store)
@@ -1,23 +1,34 @@
 import streamlit as st
-from database import supabase_client as supabase
-from login import login
-from signup import sign_up
+from database import remove_many, supabase_client as supabase
 from datetime import datetime
-from notes import notes_page
-from dotenv import load_dotenv
-import google.generativeai as genai
-import fitz
-import io
-import os
+import importlib
 from chatbot import chatbot_interface
-from flashcards import show_flashcards
-from quiz import show_quiz
+from router import choose_model
+from chat_store import NEW_CHAT_OPTION
+from document_store import selected_document_text, set_selected_document
+from loader import load_documents, warm_text_cache
+from pdf_extract import MAX_BYTES as PDF_MAX_BYTES, MAX_PAGES as PDF_MAX_PAGES
+from uploads import read_upload, upload_registry
+from metadata_cache import (CHAT_HISTORIES_KEY, CHAT_HISTORY_TTL, DOCUMENT_LIST_TTL,
+                            documents_key, metadata_cache)
+from telemetry import span, start_metrics_server
+
+# Pages are imported on first visit so their heavy dependencies stay off the login screen
+PAGES = {
+    "flashcard": ("flashcards", "show_flashcards"),
+    "quiz": ("quiz", "show_quiz"),
+    "login": ("login", "login"),
+    "signup": ("signup", "sign_up"),
+    "notes": ("notes", "notes_page"),
+    "review": ("review", "review_page"),
+}
+
+
+def load_page(page):
+    """Imports a page's module on first use and returns its render function."""
+    module_name, function_name = PAGES[page]
+    return getattr(importlib.import_module(module_name), function_name)
 
-load_dotenv()
-
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-1.5-flash")
 
 def upload_document():
     """Handles document upload to the selected chat folder in Supabase Storage."""
@@ -35,12 +46,25 @@ def upload_document():
         bucket_name = "user-documents"
         file_path = f"{user_display_name}/{selected_chat}/{uploaded_file.name}"
 
+        # The file stays in the uploader across reruns; only handle each one once
+        handled = st.session_state.setdefault("handled_uploads", {})
+        if handled.get(uploaded_file.file_id) == file_path:
+            return
+
         try:
-            # Read file content correctly
-            file_bytes = uploaded_file.read()
+            file_bytes, digest = read_upload(uploaded_file)
 
-            # Upload file as bytes
-            supabase.storage.from_(bucket_name).upload(file_path, file_bytes)
+            if not upload_registry.is_uploaded(file_path, digest):
+                # Upsert keeps repeated uploads of the same file idempotent
+                supabase.storage.from_(bucket_name).upload(
+                    file_path, file_bytes, {"content-type": uploaded_file.type or "application/pdf", "upsert": "true"}
+                )
+                upload_registry.record(file_path, digest)
+                metadata_cache.invalidate(user_display_name, documents_key(selected_chat))
+
+            handled[uploaded_file.file_id] = file_path
+            # Extract now so a later Load of this file is a cache hit
+            warm_text_cache(uploaded_file.name, file_bytes)
 
             st.sidebar.success(f"Uploaded '{uploaded_file.name}' to '{selected_chat}' successfully!")
         except Exception as e:
@@ -61,8 +85,11 @@ def fetch_user_documents():
     chat_folder = f"{user_display_name}/{selected_chat}/"
 
     try:
-        response = supabase.storage.from_(bucket_name).list(chat_folder)
-
+        with span("fetch_documents"):
+            response = metadata_cache.get_or_load(
+                user_display_name, documents_key(selected_chat), DOCUMENT_LIST_TTL,
+                lambda: supabase.storage.from_(bucket_name).list(chat_folder),
+            )
 
         if response:
             return [file["name"] for file in response]
@@ -92,14 +119,17 @@ def sidebar_options():
         st.sidebar.subheader("💬 Chat History")
         user_display_name = st.session_state["username"]
 
-        response = supabase.table("Chat-History").select("id", "name").eq("displayname", user_display_name).execute()
-        chat_histories = response.data if response.data else []
+        with span("chat_histories"):
+            chat_histories = metadata_cache.get_or_load(
+                user_display_name, CHAT_HISTORIES_KEY, CHAT_HISTORY_TTL,
+                lambda: supabase.table("Chat-History").select("id", "name").eq("displayname", user_display_name).execute().data or [],
+            )
 
-        chat_options = ["➕ Create New Chat"] + [chat["name"] for chat in chat_histories]
+        chat_options = [NEW_CHAT_OPTION] + [chat["name"] for chat in chat_histories]
         selected_chat = st.sidebar.selectbox("Select a chat history:", chat_options, index=0)
         st.session_state["selected_chat"] = selected_chat
 
-        if selected_chat == "➕ Create New Chat":
+        if selected_chat == NEW_CHAT_OPTION:
             st.session_state["creating_chat"] = True
         else:
             if st.session_state.get("selected_chat") != selected_chat:
@@ -141,30 +171,21 @@ def sidebar_options():
             if st.button("📂 Load") and selected_docs:
                 document_contents = []
                 bucket_name = "user-documents"
-
-                for doc in selected_docs:
-                    file_path = f"{user_display_name}/{selected_chat}/{doc}"
-                    print(file_path)
-
-                    try:
-                        response = supabase.storage.from_(bucket_name).download(file_path)
-
-                        if doc.lower().endswith(".pdf"):  # Handle PDFs
-                            pdf_bytes = io.BytesIO(response)  # Convert bytes to file-like object
-
-                            with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_reader:  # Properly open PDF
-                                pdf_text = "\n\n".join([page.get_text() for page in pdf_reader])
-
-                            document_contents.append(pdf_text)
-
-                        else:  # Handle text-based files normally
-                            document_contents.append(response.decode("utf-8"))
-
-                    except Exception as e:
-                        st.sidebar.error(f"Error loading {doc}: {e}")
+                folder = f"{user_display_name}/{selected_chat}/"
+
+                with span("load_documents", files=len(selected_docs)):
+                    results = load_documents(bucket_name, folder, selected_docs)
+                    for doc, text, truncated, error in results:
+                        if error is not None:
+                            st.sidebar.error(f"Error loading {doc}: {error}")
+                        else:
+                            document_contents.append(text)
+                            if truncated:
+                                st.sidebar.warning(f"Only part of {doc} was loaded: PDFs are cut off after "
+                                                   f"{PDF_MAX_PAGES} pages or {PDF_MAX_BYTES // (1024 * 1024)} MB of text.")
 
                 if document_contents:
-                    st.session_state["selected_document_text"] = "\n\n".join(document_contents)
+                    set_selected_document("\n\n".join(document_contents))
                     st.sidebar.success(f"Loaded: {', '.join(selected_docs)}")
 
 
@@ -191,6 +212,8 @@ def sidebar_options():
             st.session_state["page"] = "notes"
         if st.sidebar.button("📖 Quiz"):
             st.session_state["page"]="quiz"
+        if st.sidebar.button("🔁 Review"):
+            st.session_state["page"] = "review"
 
         # Logout Button
         if st.sidebar.button("🚪 Log Out"):
@@ -209,9 +232,12 @@ def delete_documents(file_names):
     try:
         user_display_name = st.session_state["username"]
         bucket_name = "user-documents"
-        file_paths = [f"{user_display_name}/{file}" for file in file_names]
+        selected_chat = st.session_state.get("selected_chat")
+        file_paths = [f"{user_display_name}/{selected_chat}/{file}" for file in file_names]
 
-        supabase.storage.from_(bucket_name).remove(file_paths)
+        remove_many(bucket_name, file_paths)
+        upload_registry.forget(file_paths)
+        metadata_cache.invalidate(user_display_name)
         st.sidebar.success(f"Deleted: {', '.join(file_names)} successfully!")
         st.rerun()
     except Exception as e:
@@ -247,6 +273,8 @@ def save_chat_history(chat_name):
         placeholder_content = b"Folder placeholder"
 
         supabase.storage.from_(bucket_name).upload(placeholder_file_path, placeholder_content)
+        metadata_cache.invalidate(user_display_name, CHAT_HISTORIES_KEY)
+        metadata_cache.invalidate(user_display_name, documents_key(chat_name))
 
         st.sidebar.success(f"Chat history '{chat_name}' created successfully!")
         st.session_state["creating_chat"] = False
@@ -263,44 +291,43 @@ def homepage():
 
     if "user_logged_in" in st.session_state and st.session_state["user_logged_in"]:
         st.success(f"Welcome, {st.session_state['username']}!")
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        document_text = st.session_state.get("selected_document_text", "")
+        model = choose_model("chat")
+        document_text = selected_document_text()
         chatbot_interface(model, document_text)
 
 
 def main():
     st.set_page_config(page_title="AI Tutoring System", page_icon="🎓")
+    start_metrics_server()
 
     if "page" not in st.session_state:
         st.session_state["page"] = "home"
 
-    with st.sidebar:
-        if "user_logged_in" not in st.session_state or not st.session_state["user_logged_in"]:
-            if st.button("Sign Up"):
-                st.session_state["page"] = "signup"
-                st.rerun()
-            if st.button("Login"):
-                st.session_state["page"] = "login"
-                st.rerun()
-        else:
-            sidebar_options()
-    
-
-    if st.session_state["page"] == "home":
-        homepage()
-    elif st.session_state["page"] == "flashcard":
-        document_text = st.session_state.get("selected_document_text", "")
-        show_flashcards(model,document_text)
-    elif st.session_state["page"] == "quiz":
-        document_text = st.session_state.get("selected_document_text", "")
-        show_quiz(model,document_text)
-    elif st.session_state["page"] == "login":
-        login()
-    elif st.session_state["page"] == "signup":
-        sign_up()
-    elif st.session_state["page"] == "notes":
-        notes_page()
-
+    # One trace per rerun; the sidebar and page spans below nest inside it
+    with span("rerun", page=st.session_state["page"]):
+        with st.sidebar:
+            if "user_logged_in" not in st.session_state or not st.session_state["user_logged_in"]:
+                if st.button("Sign Up"):
+                    st.session_state["page"] = "signup"
+                    st.rerun()
+                if st.button("Login"):
+                    st.session_state["page"] = "login"
+                    st.rerun()
+            else:
+                with span("sidebar"):
+                    sidebar_options()
+
+        with span("page", page=st.session_state["page"]):
+            if st.session_state["page"] == "home":
+                homepage()
+            elif st.session_state["page"] == "flashcard":
+                document_text = selected_document_text()
+                load_page("flashcard")(choose_model("flashcards", len(document_text)), document_text)
+            elif st.session_state["page"] == "quiz":
+                document_text = selected_document_text()
+                load_page("quiz")(choose_model("quiz", len(document_text)), document_text)
+            elif st.session_state["page"] in ("login", "signup", "notes", "review"):
+                load_page(st.session_state["page"])()
 
 if __name__ == "__main__":
     main()
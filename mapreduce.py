@@ -0,0 +1,79 @@
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from jobs import report_progress
+from retrieval import chunk_text
+
+# Documents longer than this are generated section by section
+MAP_REDUCE_WORDS = int(os.environ.get("MAP_REDUCE_WORDS", "6000"))
+SECTION_WORDS = int(os.environ.get("MAP_REDUCE_SECTION_WORDS", "3000"))
+MAX_SECTIONS = int(os.environ.get("MAP_REDUCE_MAX_SECTIONS", "8"))
+MAP_WORKERS = int(os.environ.get("MAP_REDUCE_WORKERS", "4"))
+
+
+def needs_map_reduce(text):
+    """Returns True when a document is long enough to be generated in sections."""
+    return len(text.split()) > MAP_REDUCE_WORDS
+
+
+def split_sections(text, max_sections=MAX_SECTIONS):
+    """Splits a document into at most `max_sections` contiguous sections."""
+    words = len(text.split())
+    section_words = max(SECTION_WORDS, math.ceil(words / max_sections))
+    return chunk_text(text, section_words, overlap=0)
+
+
+def per_section_count(total, sections):
+    """Number of items to request per section, with headroom for deduplication."""
+    return max(1, math.ceil(total * 1.5 / sections))
+
+
+def map_sections(sections, generate, workers=MAP_WORKERS):
+    """Runs `generate(section)` for every section concurrently; results keep section order.
+
+    A failed section yields an empty list instead of failing the whole document.
+    """
+    def run(section):
+        try:
+            return generate(section)
+        except Exception:
+            return []
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, section) for section in sections]
+        for future in futures:
+            results.append(future.result())
+            report_progress(len(results), len(sections))
+    return results
+
+
+def normalize(text):
+    """Normalizes text for duplicate detection."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def merge_round_robin(section_results, key, limit=None):
+    """Merges per-section results, dropping duplicates and interleaving sections evenly.
+
+    Taking one item from each section in turn means any cut at `limit` still
+    covers the whole document rather than just its opening sections.
+    """
+    seen = set()
+    merged = []
+    queues = [list(items) for items in section_results]
+    while any(queues) and (limit is None or len(merged) < limit):
+        for queue in queues:
+            if not queue:
+                continue
+            item = queue.pop(0)
+            item_key = normalize(key(item))
+            if item_key in seen:
+                continue
+            seen.add(item_key)
+            merged.append(item)
+            if limit is not None and len(merged) >= limit:
+                break
+    return merged
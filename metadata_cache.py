@@ -0,0 +1,46 @@
+import os
+import threading
+import time
+
+CHAT_HISTORY_TTL = float(os.environ.get("CHAT_HISTORY_CACHE_TTL", "60"))
+DOCUMENT_LIST_TTL = float(os.environ.get("DOCUMENT_LIST_CACHE_TTL", "30"))
+
+CHAT_HISTORIES_KEY = "chat-histories"
+
+
+class MetadataCache:
+    """Short-lived, per-user cache of Supabase metadata queries."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, user, key, ttl, load):
+        """Returns the cached value for (user, key), calling `load()` when missing or stale."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((user, key))
+            if entry and entry[0] > now:
+                return entry[1]
+
+        value = load()  # Errors propagate and nothing is cached
+        with self._lock:
+            self._entries[(user, key)] = (now + ttl, value)
+        return value
+
+    def invalidate(self, user, key=None):
+        """Drops one cached entry for a user, or all of them when `key` is None."""
+        with self._lock:
+            if key is not None:
+                self._entries.pop((user, key), None)
+                return
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == user]:
+                del self._entries[entry_key]
+
+
+metadata_cache = MetadataCache()
+
+
+def documents_key(chat_name):
+    """Cache key for the storage listing of one chat folder."""
+    return f"documents:{chat_name}"
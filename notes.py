@@ -1,24 +1,24 @@
 import streamlit as st
-import os
 from database import supabase_client as supabase
-from PyPDF2 import PdfReader
-from google.generativeai import configure, GenerativeModel
-from dotenv import load_dotenv
-from docx import Document
-import re
+from text_cache import text_cache
+from pdf_extract import extract_text, extractor_id
+from gen_cache import generation_cache
+from router import choose_model, generate_content
+from jobs import job_running, submit_job, wait_for_job
+from docx_export import create_docx
+from document_store import SESSION_KEY, selected_document_text, set_selected_document
+from telemetry import traced
 
-load_dotenv()
-
-# Configure Gemini-1.5-Pro API
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-configure(api_key=GEMINI_API_KEY)
-model = GenerativeModel("gemini-1.5-pro")
+NOTES_PROMPT = (
+    "Analyze and enhance the following notes for better learning. "
+    "User request: {user_prompt}\n\n{content}"
+)
 
 
 def fetch_document_content(file_name):
     """Fetches and reads the selected document from session state or Supabase Storage."""
-    if "selected_document_text" in st.session_state:
-        return st.session_state["selected_document_text"]
+    if SESSION_KEY in st.session_state:
+        return selected_document_text()
 
     user_display_name = st.session_state["username"]
     selected_chat = st.session_state.get("selected_chat")
@@ -34,7 +34,7 @@ def fetch_document_content(file_name):
         response = supabase.storage.from_(bucket_name).download(file_path)
         if response:
             document_text = response.decode("utf-8")
-            st.session_state["selected_document_text"] = document_text
+            set_selected_document(document_text)
             return document_text
         else:
             st.error("Failed to retrieve the document.")
@@ -44,78 +44,29 @@ def fetch_document_content(file_name):
         return None
 
 
-def analyze_notes(content, user_prompt):
-    """Uses Gemini AI to analyze and enhance notes."""
-    prompt = (
-        f"Analyze and enhance the following notes for better learning. "
-        f"User request: {user_prompt}\n\n{content}"
-    )
-    try:
-        response = model.generate_content(prompt)
-        return response.text if response else "AI analysis failed."
-    except Exception as e:
-        st.error(f"Error in AI analysis: {e}")
-        return None
+@traced("analyze_notes")
+def enhance_notes(content, user_prompt):
+    """Uses Gemini AI to enhance notes; raises on API errors. Safe to run off the script thread."""
+    prompt = NOTES_PROMPT.format(user_prompt=user_prompt, content=content)
+    # The enhanced notes restate the whole document, so expect about as much output as input
+    model = choose_model("notes", len(content), len(content))
+    return generation_cache.get_or_generate(
+        model, NOTES_PROMPT, content, {"user_prompt": user_prompt},
+        lambda: generate_content(model, prompt).text,
+    ) or "AI analysis failed."
 
 
-def create_docx(text):
-    """Generates a properly formatted DOCX file from the enhanced notes."""
-    doc = Document()
-
-    for line in text.split("\n"):
-        line = line.strip()
-
-        if not line:
-            doc.add_paragraph("")  # Preserve blank lines
-            continue
-
-        # Headings (Markdown-style)
-        if line.startswith("# "):
-            doc.add_heading(line[2:], level=1)
-            continue
-        elif line.startswith("## "):
-            doc.add_heading(line[3:], level=2)
-            continue
-        elif line.startswith("### "):
-            doc.add_heading(line[4:], level=3)
-            continue
-
-        # Bullet Points
-        elif line.startswith(("- ", "* ")):
-            doc.add_paragraph(line[2:], style="ListBullet")
-            continue
-
-        # Numbered List
-        elif re.match(r"^\d+\.\s", line):
-            doc.add_paragraph(line, style="ListNumber")
-            continue
-
-        # Handle bold and italic formatting inside paragraphs
-        para = doc.add_paragraph()
-        pattern = re.compile(r"(\*\*.*?\*\*|\*.*?\*)")  # Match **bold** and *italic*
-        matches = pattern.split(line)  # Split line into formatted segments
-
-        for part in matches:
-            if part.startswith("**") and part.endswith("**"):
-                run = para.add_run(part[2:-2])  # Remove ** and apply bold
-                run.bold = True
-            elif part.startswith("*") and part.endswith("*"):
-                run = para.add_run(part[1:-1])  # Remove * and apply italic
-                run.italic = True
-            else:
-                para.add_run(part)  # Add normal text
-
-    doc_path = "Enhanced_Notes.docx"
-    doc.save(doc_path)
-
-    return doc_path
+def extract_pypdf2_text(pdf_data):
+    """Extracts PDF text with the PyPDF2 backend."""
+    return extract_text(pdf_data, "pypdf2")
+
 
 def notes_page():
     """Displays the AI-Enhanced Notes page in Streamlit."""
     st.title("📑 AI-Enhanced Notes")
     st.write("AI will enhance your selected document for better learning.")
 
-    file_content = st.session_state.get("selected_document_text")
+    file_content = selected_document_text()
 
     if not file_content:
         st.warning("⚠️ No document content available. Please upload or select a document.")
@@ -124,9 +75,7 @@ def notes_page():
     text = ""
     try:
         if isinstance(file_content, bytes):
-            from io import BytesIO
-            pdf_reader = PdfReader(BytesIO(file_content))
-            text = "\n".join([page.extract_text() for page in pdf_reader.pages if page.extract_text()])
+            text = text_cache.get_or_extract(file_content, extractor_id("pypdf2"), extract_pypdf2_text)
         else:
             text = file_content
     except Exception as e:
@@ -137,13 +86,24 @@ def notes_page():
     user_prompt = st.text_area("✍️ Specify your learning focus",
                                placeholder="Summarize key concepts, explain acronyms, etc.")
 
-    if st.button("🧠 Enhance Notes"):
-        enhanced_notes = analyze_notes(text, user_prompt)
-        st.session_state["enhanced_notes"] = enhanced_notes
+    if st.button("🧠 Enhance Notes", disabled=job_running("notes")):
+        # Runs on the job pool, so reruns while waiting don't restart the request
+        submit_job("notes", enhance_notes, text, user_prompt)
+        st.rerun()  # Redraw with the button disabled while the job runs
+
+    enhanced_notes = st.session_state.get("enhanced_notes")
+    if enhanced_notes:
         st.markdown(enhanced_notes, unsafe_allow_html=True)
 
-        docx_path = create_docx(enhanced_notes)
-        with open(docx_path, "rb") as docx_file:
-            st.download_button(label="📥 Download Enhanced Notes (DOCX)", data=docx_file,
-                               file_name="Enhanced_Notes.docx",
-                               mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+        # Built in memory per session; nothing is written to the shared working directory
+        st.download_button(label="📥 Download Enhanced Notes (DOCX)", data=create_docx(enhanced_notes),
+                           file_name="Enhanced_Notes.docx",
+                           mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+
+    job = wait_for_job("notes", "🧠 Enhancing notes...")
+    if job is not None:
+        if job.error:
+            st.error(f"Error in AI analysis: {job.error}")
+        else:
+            st.session_state["enhanced_notes"] = job.result
+            st.rerun()
@@ -0,0 +1,81 @@
+import io
+import os
+
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "2000"))
+MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Page separator each backend has always used when joining page text
+SEPARATORS = {"pymupdf": "\n\n", "pypdf2": "\n"}
+
+
+def _iter_pymupdf(pdf_data, start, stop):
+    import fitz
+
+    with fitz.open(stream=pdf_data, filetype="pdf") as pdf_reader:
+        for page_number in range(start, min(stop, pdf_reader.page_count)):
+            # Only one page object is alive at a time
+            yield pdf_reader.load_page(page_number).get_text()
+
+
+def _iter_pypdf2(pdf_data, start, stop):
+    from PyPDF2 import PdfReader
+
+    pdf_reader = PdfReader(io.BytesIO(pdf_data))
+    for page_number in range(start, min(stop, len(pdf_reader.pages))):
+        yield pdf_reader.pages[page_number].extract_text() or ""
+
+
+BACKENDS = {"pymupdf": _iter_pymupdf, "pypdf2": _iter_pypdf2}
+
+
+def iter_pages(pdf_data, backend="pymupdf", pages=None, max_pages=MAX_PAGES):
+    """Lazily yields the text of each page of a PDF.
+
+    `pages` is an optional (start, stop) pair of zero-based page numbers; at most
+    `max_pages` pages are read.
+    """
+    start, stop = pages or (0, max_pages)
+    stop = min(stop, start + max_pages)
+    yield from BACKENDS[backend](pdf_data, start, stop)
+
+
+def extract_text_checked(pdf_data, backend="pymupdf", pages=None, max_pages=MAX_PAGES, max_bytes=MAX_BYTES):
+    """Extracts PDF text page by page, stopping once `max_bytes` of text is collected.
+
+    Returns (text, truncated), where `truncated` says pages or text past the limits were left out.
+    """
+    separator = SEPARATORS[backend]
+    output = io.StringIO()
+    remaining = max_bytes
+    truncated = False
+
+    # One page past the limit is requested only to find out whether the document goes on
+    page_texts = iter_pages(pdf_data, backend, pages, max_pages + 1)
+    for index, text in enumerate(page_texts):
+        if index == max_pages:
+            truncated = True
+            break
+        if backend == "pypdf2" and not text:
+            continue  # PyPDF2 output has always skipped pages without text
+        if output.tell():
+            output.write(separator)
+        encoded = text.encode("utf-8")
+        if len(encoded) >= remaining:
+            output.write(encoded[:remaining].decode("utf-8", errors="ignore"))
+            truncated = len(encoded) > remaining or next(page_texts, None) is not None
+            break
+        output.write(text)
+        remaining -= len(encoded)
+
+    return output.getvalue(), truncated
+
+
+def extract_text(pdf_data, backend="pymupdf", pages=None, max_pages=MAX_PAGES, max_bytes=MAX_BYTES):
+    """Extracts PDF text page by page, stopping once `max_bytes` of text is collected."""
+    return extract_text_checked(pdf_data, backend, pages, max_pages, max_bytes)[0]
+
+
+def extractor_id(backend, pages=None):
+    """Identifies an extraction configuration, for use as a text cache key."""
+    page_range = f"{pages[0]}_{pages[1]}" if pages else "all"
+    return f"{backend}-{page_range}-{MAX_PAGES}-{MAX_BYTES}"
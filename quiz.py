@@ -1,6 +1,27 @@
 import streamlit as st
-import google.generativeai as genai
-import os
+import re
+from gen_cache import generation_cache, generation_key
+from router import generate_content
+from jobs import POLL_INTERVAL, job_queue, report_progress
+from mapreduce import map_sections, merge_round_robin, needs_map_reduce, per_section_count, split_sections
+from telemetry import span
+from review import enroll_cards
+
+QUIZ_PROMPT = (
+    "Create a {num_questions}-question multiple-choice quiz based on the following text:\n"
+    "For each question, provide four options (A, B, C, D) and specify the correct answer.\n"
+    "Format:\n"
+    "Q: [question]\n"
+    "A) [option1]\n"
+    "B) [option2]\n"
+    "C) [option3]\n"
+    "D) [option4]\n"
+    "Correct: [correct option letter]\n\n"
+    "Text:\n{text}"
+)
+
+# A question block is complete once its "Correct:" line has been terminated
+CORRECT_LINE = re.compile(r"^Correct:[^\n]*\n", re.MULTILINE)
 
 def initialize_session_state():
     """Initializes session state variables for the quiz."""
@@ -15,22 +36,46 @@ def initialize_session_state():
     if 'quiz_finished' not in st.session_state:
         st.session_state.quiz_finished = False
 
-def generate_quiz(model, text, num_questions):
-    """Generates a multiple-choice quiz from the provided text."""
-    response = model.generate_content(
-        f"Create a {num_questions}-question multiple-choice quiz based on the following text:\n"
-        f"For each question, provide four options (A, B, C, D) and specify the correct answer.\n"
-        f"Format:\n"
-        f"Q: [question]\n"
-        f"A) [option1]\n"
-        f"B) [option2]\n"
-        f"C) [option3]\n"
-        f"D) [option4]\n"
-        f"Correct: [correct option letter]\n\n"
-        f"Text:\n{text}"
+def correct_option(question):
+    """Returns the text of the correct option, given the letter the model marked as correct."""
+    letter = question["correct_answer"].strip()[:1].upper()
+    index = ord(letter) - ord("A") if letter else -1
+    if 0 <= index < len(question["options"]):
+        return question["options"][index]
+    return question["correct_answer"]
+
+def correct_label(question):
+    """Returns the correct option as students see it, e.g. "B) Chemical energy"."""
+    letter = question["correct_answer"].strip()[:1].upper()
+    answer = correct_option(question)
+    return f"{letter}) {answer}" if answer in question["options"] else answer
+
+def quiz_cards(questions, answers):
+    """Builds review cards and SM-2 outcomes from a finished quiz; unanswered questions get no outcome."""
+    cards = []
+    outcomes = []
+    for question, answer in zip(questions, answers):
+        options = "\n".join(f"{chr(ord('A') + i)}) {option}" for i, option in enumerate(question["options"]))
+        cards.append((f"{question['question']}\n\n{options}", correct_label(question)))
+        outcomes.append(None if answer is None else 5 if answer == correct_option(question) else 1)
+    return cards, outcomes
+
+def generate_quiz_map_reduce(model, text, num_questions, regenerate=False):
+    """Generates questions per document section concurrently, then merges and samples them."""
+    sections = split_sections(text)
+    count = per_section_count(num_questions, len(sections))
+    section_quizzes = map_sections(sections, lambda section: generate_section_quiz(model, section, count, regenerate))
+    return merge_round_robin(section_quizzes, key=lambda question: question["question"], limit=num_questions)
+
+def generate_section_quiz(model, text, num_questions, regenerate=False):
+    """Generates a multiple-choice quiz from a single prompt over the text."""
+    quiz_text = generation_cache.get_or_generate(
+        model, QUIZ_PROMPT, text, {"num_questions": num_questions},
+        lambda: generate_content(model, QUIZ_PROMPT.format(num_questions=num_questions, text=text)).text,
+        refresh=regenerate,
     )
 
-    return extract_quiz_data(response.text)
+    return extract_quiz_data(quiz_text)
 
 def extract_quiz_data(quiz_text):
     """Parses and extracts structured quiz data from the Gemini response."""
@@ -47,6 +92,77 @@ def extract_quiz_data(quiz_text):
     
     return quiz_data
 
+class QuizStreamParser:
+    """Incrementally parses streamed quiz text, emitting each question once its block is complete."""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        """Adds a chunk of model output and returns any newly completed questions."""
+        self.buffer += text
+        questions = []
+        match = CORRECT_LINE.search(self.buffer)
+        while match:
+            block, self.buffer = self.buffer[:match.end()], self.buffer[match.end():]
+            questions.extend(extract_quiz_data(block))
+            match = CORRECT_LINE.search(self.buffer)
+        return questions
+
+    def close(self):
+        """Parses whatever is left once the stream has ended."""
+        block, self.buffer = self.buffer, ""
+        return extract_quiz_data(block)
+
+class QuizStream:
+    """Quiz generated on the job pool; `questions` grows as each one is parsed."""
+
+    def __init__(self, model, text, num_questions, regenerate=False):
+        self.questions = []
+        self.num_questions = num_questions
+        self.done = False
+        self.error = None
+        self.job_id = job_queue.submit("quiz", self._run, model, text, num_questions, regenerate)
+
+    def _add(self, questions):
+        # Never hand out more questions than the answer sheet has room for
+        self.questions.extend(questions[:self.num_questions - len(self.questions)])
+        report_progress(len(self.questions), self.num_questions)
+
+    def _run(self, model, text, num_questions, regenerate):
+        with span("generate_quiz", questions=num_questions, streamed=True) as record:
+            try:
+                if needs_map_reduce(text):
+                    self._add(generate_quiz_map_reduce(model, text, num_questions, regenerate))
+                    return
+
+                params = {"num_questions": num_questions}
+                key = generation_key(model, QUIZ_PROMPT, text, params)
+                quiz_text = None if regenerate else generation_cache.get(key)
+                if quiz_text is not None:
+                    self._add(extract_quiz_data(quiz_text))
+                    return
+
+                parser = QuizStreamParser()
+                chunks = []
+                response = generate_content(model, QUIZ_PROMPT.format(num_questions=num_questions, text=text), stream=True)
+                for chunk in response:
+                    chunks.append(chunk.text)
+                    self._add(parser.feed(chunk.text))
+                self._add(parser.close())
+                generation_cache.put(key, "".join(chunks))
+            except Exception as e:
+                self.error = e
+                record["error"] = type(e).__name__
+            finally:
+                self.done = True
+
+@st.fragment(run_every=POLL_INTERVAL)
+def wait_for_question(stream, index):
+    if stream.done or index < len(stream.questions):
+        st.rerun()  # A full rerun shows the new question, or the results if generation ended early
+    st.progress(len(stream.questions) / stream.num_questions, text=f"Generating question {index + 1}...")
+
 def display_question(question_idx):
     """Displays a single question and options."""
     question = st.session_state.quiz[question_idx]
@@ -62,42 +178,67 @@ def show_quiz(model,text):
 
     num_questions = st.number_input("How many questions do you want?", min_value=1, max_value=10, value=5)
 
-    if st.button("Generate Quiz"):
+    col1, col2 = st.columns(2)
+    generate = col1.button("Generate Quiz")
+    # Generate Quiz reuses a stored quiz for the same document and size; New Quiz always asks the model
+    regenerate = col2.button("🔄 New Quiz")
+    if generate or regenerate:
         if text and num_questions > 0:
-            with st.spinner("Generating quiz..."):
-                st.session_state.quiz = generate_quiz(model, text, num_questions)
-                st.session_state.current_question = 0
-                st.session_state.player_score = 0
-                st.session_state.user_answers = [None] * num_questions
-                st.session_state.quiz_finished = False
-                st.rerun()
+            # Questions are appended to the quiz list as they stream in
+            stream = QuizStream(model, text, num_questions, regenerate)
+            st.session_state.quiz_stream = stream
+            st.session_state.quiz = stream.questions
+            st.session_state.current_question = 0
+            st.session_state.player_score = 0
+            st.session_state.user_answers = [None] * num_questions
+            st.session_state.quiz_finished = False
+            st.session_state.quiz_enrolled = False
+            st.rerun()
         else:
             st.error("Please enter valid text and select the number of questions.")
 
-    if "quiz" in st.session_state and st.session_state.quiz:
+    stream = st.session_state.get("quiz_stream")
+    generating = stream is not None and not stream.done
+    if stream is not None and stream.error:
+        st.error(f"Error generating quiz: {stream.error}")
+
+    if st.session_state.current_question < len(st.session_state.quiz):
+        if generating:
+            st.caption(f"{len(st.session_state.quiz)} of {stream.num_questions} questions ready, more on the way...")
         selected_option = display_question(st.session_state.current_question)
         
         if st.button("Save and Next"):
-            correct_answer = st.session_state.quiz[st.session_state.current_question]['correct_answer']
-            if selected_option == correct_answer:
+            # The model marks the answer by letter; the radio returns the option text
+            if selected_option == correct_option(st.session_state.quiz[st.session_state.current_question]):
                 st.session_state.player_score += 1
             
             st.session_state.user_answers[st.session_state.current_question] = selected_option
             
-            if st.session_state.current_question < len(st.session_state.quiz) - 1:
+            if st.session_state.current_question < len(st.session_state.quiz) - 1 or generating:
                 st.session_state.current_question += 1
                 st.rerun()
             else:
                 st.session_state.quiz_finished = True
+    elif generating:
+        # The student is ahead of the model; only the fragment polls until the next question arrives
+        wait_for_question(stream, st.session_state.current_question)
+    elif st.session_state.quiz and not st.session_state.quiz_finished:
+        # Generation ended with fewer questions than requested
+        st.session_state.quiz_finished = True
 
     if st.session_state.quiz_finished:
+        if not st.session_state.get("quiz_enrolled"):
+            # Missed questions come back sooner on the review page than ones answered correctly
+            enroll_cards("quiz", *quiz_cards(st.session_state.quiz, st.session_state.user_answers))
+            st.session_state.quiz_enrolled = True
+
         st.subheader("Quiz Completed!")
         st.write(f"Your Score: **{st.session_state.player_score} / {len(st.session_state.quiz)}**")
 
         for i, question in enumerate(st.session_state.quiz):
             user_answer = st.session_state.user_answers[i]
-            correct_answer = question['correct_answer']
-            status = "✅ Correct" if user_answer == correct_answer else f"❌ Incorrect (Correct: {correct_answer})"
+            status = ("✅ Correct" if user_answer == correct_option(question)
+                      else f"❌ Incorrect (Correct: {correct_label(question)})")
             st.write(f"Q{i+1}: {question['question']}")
             st.write(f"Your answer: {user_answer} - {status}")
             st.write("")
@@ -0,0 +1,111 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from text_cache import content_hash
+
+CHUNK_WORDS = int(os.environ.get("RETRIEVAL_CHUNK_WORDS", "200"))
+CHUNK_OVERLAP = int(os.environ.get("RETRIEVAL_CHUNK_OVERLAP", "40"))
+TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "5"))
+MAX_INDEXES = int(os.environ.get("RETRIEVAL_MAX_INDEXES", "16"))
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercases text and splits it into word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Splits text into overlapping windows of roughly `chunk_words` words."""
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 index over the chunks of a single document."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freqs = Counter()
+        for freqs in self.term_freqs:
+            doc_freqs.update(freqs.keys())
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in doc_freqs.items()
+        }
+
+        # Inverted index so a query only touches chunks that share a term with it
+        self.postings = {}
+        for chunk_id, freqs in enumerate(self.term_freqs):
+            for term in freqs:
+                self.postings.setdefault(term, []).append(chunk_id)
+
+    def search(self, query, top_k=TOP_K):
+        """Returns the `top_k` chunks most relevant to the query, in document order."""
+        scores = Counter()
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id in self.postings[term]:
+                tf = self.term_freqs[chunk_id][term]
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / (self.avg_length or 1))
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(chunk_id for chunk_id, _ in scores.most_common(top_k))
+        return [self.chunks[chunk_id] for chunk_id in best]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(document_text, digest=None):
+    """Returns the BM25 index for a document, building it once per document hash.
+
+    Pass `digest` when the content hash is already known to skip hashing the text.
+    """
+    if digest is None:
+        digest = content_hash(document_text.encode("utf-8"))
+    with _indexes_lock:
+        if digest in _indexes:
+            _indexes.move_to_end(digest)
+            return _indexes[digest]
+
+    index = BM25Index(chunk_text(document_text))
+
+    with _indexes_lock:
+        _indexes[digest] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def retrieve_context(document_text, question, top_k=TOP_K, digest=None):
+    """Returns the passages of a document most relevant to the question."""
+    index = get_index(document_text, digest)
+    passages = index.search(question, top_k)
+    if not passages:
+        # Nothing matched lexically; fall back to the opening of the document
+        passages = index.chunks[:top_k]
+    return "\n\n...\n\n".join(passages)
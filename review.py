@@ -0,0 +1,283 @@
+import atexit
+import hashlib
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import streamlit as st
+
+from database import supabase_client as supabase
+from telemetry import span
+
+REVIEW_TABLE = "Review-Cards"
+
+DAY = 24 * 60 * 60
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+EASY_FIRST_INTERVAL = 4  # Days; a card known perfectly on first sight skips the one-day step
+
+SESSION_CARDS = int(os.environ.get("REVIEW_SESSION_CARDS", "20"))
+FLUSH_BATCH = int(os.environ.get("REVIEW_FLUSH_BATCH", "20"))
+LOAD_PAGE_ROWS = int(os.environ.get("REVIEW_LOAD_PAGE_ROWS", "1000"))
+CACHED_USERS = int(os.environ.get("REVIEW_CACHED_USERS", "256"))
+
+# Button label -> SM-2 response quality (0-5)
+GRADES = {"Again": 1, "Hard": 3, "Good": 4, "Easy": 5}
+
+STATE_COLUMNS = ("card_id", "kind", "front", "back", "ease", "interval", "repetitions", "due")
+
+
+def card_id(kind, front):
+    """Identifies a card by what it asks, so re-adding the same card keeps its review state."""
+    return hashlib.sha256(f"{kind}\n{front}".encode("utf-8")).hexdigest()
+
+
+def sm2(card, quality, now):
+    """Applies one SM-2 review of the given quality (0-5) to a card's state in place."""
+    if quality < 3:
+        card["repetitions"] = 0
+        card["interval"] = 1
+    else:
+        card["repetitions"] += 1
+        if card["repetitions"] == 1:
+            card["interval"] = EASY_FIRST_INTERVAL if quality == 5 else 1
+        elif card["repetitions"] == 2:
+            card["interval"] = 6
+        else:
+            card["interval"] = round(card["interval"] * card["ease"])
+    card["ease"] = max(MIN_EASE, card["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    card["due"] = now + card["interval"] * DAY
+
+
+class ReviewDeck:
+    """One user's cards indexed by a min-heap on due time.
+
+    Rescheduling pushes a new heap entry instead of searching for the old one;
+    entries whose due time no longer matches their card are skipped when popped.
+    """
+
+    def __init__(self, rows=()):
+        self.cards = {row["card_id"]: {column: row[column] for column in STATE_COLUMNS} for row in rows}
+        self._heap = [(card["due"], cid) for cid, card in self.cards.items()]
+        heapq.heapify(self._heap)
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _schedule(self, card):
+        heapq.heappush(self._heap, (card["due"], card["card_id"]))
+        self._dirty.add(card["card_id"])
+        if len(self._heap) > 2 * len(self.cards) + 64:
+            # Too many stale entries; rebuild from the live cards
+            self._heap = [(card["due"], cid) for cid, card in self.cards.items()]
+            heapq.heapify(self._heap)
+
+    def add(self, kind, front, back, now=None):
+        """Adds a card due immediately; returns its id. Existing cards keep their state."""
+        cid = card_id(kind, front)
+        with self._lock:
+            card = self.cards.get(cid)
+            if card is None:
+                card = self.cards[cid] = {
+                    "card_id": cid, "kind": kind, "front": front, "back": back,
+                    "ease": DEFAULT_EASE, "interval": 0, "repetitions": 0,
+                    "due": time.time() if now is None else now,
+                }
+                self._schedule(card)
+            elif card["back"] != back:
+                card["back"] = back
+                self._dirty.add(cid)
+        return cid
+
+    def review(self, cid, quality, now=None):
+        """Records a review outcome and reschedules the card."""
+        with self._lock:
+            card = self.cards[cid]
+            sm2(card, quality, time.time() if now is None else now)
+            self._schedule(card)
+
+    def due(self, limit, now=None):
+        """Returns the ids of up to `limit` cards due by `now`, soonest first, in O(limit log n)."""
+        now = time.time() if now is None else now
+        found = []
+        seen = set()
+        with self._lock:
+            while self._heap and len(found) < limit and self._heap[0][0] <= now:
+                due, cid = heapq.heappop(self._heap)
+                card = self.cards.get(cid)
+                if card is None or card["due"] != due or cid in seen:
+                    continue  # Stale entry left behind by a reschedule
+                seen.add(cid)
+                found.append((due, cid))
+            for entry in found:
+                heapq.heappush(self._heap, entry)
+        return [cid for _, cid in found]
+
+    def next_due(self):
+        """Returns when the soonest card falls due, or None for an empty deck."""
+        with self._lock:
+            while self._heap:
+                due, cid = self._heap[0]
+                card = self.cards.get(cid)
+                if card is not None and card["due"] == due:
+                    return due
+                heapq.heappop(self._heap)
+        return None
+
+    def dirty_count(self):
+        with self._lock:
+            return len(self._dirty)
+
+    def take_dirty(self):
+        """Returns the rows changed since the last call and clears the change set."""
+        with self._lock:
+            rows = [dict(self.cards[cid]) for cid in self._dirty]
+            self._dirty.clear()
+        return rows
+
+    def mark_dirty(self, card_ids):
+        with self._lock:
+            self._dirty.update(card_ids)
+
+
+class ReviewStore:
+    """Process-wide cache of users' review decks, persisted with bulk upserts."""
+
+    def __init__(self, max_users=CACHED_USERS):
+        self.max_users = max_users
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_rows(self, user):
+        rows = []
+        while True:
+            page = (supabase.table(REVIEW_TABLE).select(*STATE_COLUMNS).eq("displayname", user)
+                    .range(len(rows), len(rows) + LOAD_PAGE_ROWS - 1).execute().data or [])
+            rows.extend(page)
+            if len(page) < LOAD_PAGE_ROWS:
+                return rows
+
+    def deck(self, user):
+        """Returns a user's deck, loading it from Supabase on first use; load errors propagate."""
+        with self._lock:
+            if user in self._decks:
+                self._decks.move_to_end(user)
+                return self._decks[user]
+
+        with span("load_review_deck"):
+            loaded = ReviewDeck(self._load_rows(user))
+
+        with self._lock:
+            deck = self._decks.setdefault(user, loaded)
+            self._decks.move_to_end(user)
+            # Decks with unsaved reviews are kept until they have been flushed
+            for evicted in [name for name, cached in self._decks.items() if not cached.dirty_count()]:
+                if len(self._decks) <= self.max_users:
+                    break
+                del self._decks[evicted]
+        return deck
+
+    def flush(self, user):
+        """Upserts every changed card of a user in one request; returns the number written."""
+        with self._lock:
+            deck = self._decks.get(user)
+        if deck is None:
+            return 0
+        rows = deck.take_dirty()
+        if not rows:
+            return 0
+        reviewed_at = datetime.utcnow().isoformat()
+        try:
+            with span("persist_reviews", rows=len(rows)):
+                supabase.table(REVIEW_TABLE).upsert(
+                    [dict(row, displayname=user, reviewed_at=reviewed_at) for row in rows],
+                    on_conflict="displayname,card_id",
+                ).execute()
+        except Exception:
+            deck.mark_dirty(row["card_id"] for row in rows)  # Retried on the next flush
+            raise
+        return len(rows)
+
+    def flush_all(self):
+        with self._lock:
+            users = list(self._decks)
+        for user in users:
+            try:
+                self.flush(user)
+            except Exception:
+                pass
+
+
+review_store = ReviewStore()
+atexit.register(review_store.flush_all)
+
+
+def enroll_cards(kind, cards, outcomes=None):
+    """Adds (front, back) cards to the current user's deck; `outcomes` optionally grades them.
+
+    Failures only cost the review history, so they are reported as a warning.
+    """
+    user = st.session_state.get("username")
+    if not user:
+        return
+    try:
+        deck = review_store.deck(user)
+        for i, (front, back) in enumerate(cards):
+            cid = deck.add(kind, front, back)
+            if outcomes is not None and outcomes[i] is not None:
+                deck.review(cid, outcomes[i])
+        review_store.flush(user)
+    except Exception as e:
+        st.warning(f"Cards could not be saved for review: {e}")
+
+
+def review_page():
+    """Serves due cards one at a time from the stored deck; no model calls are needed."""
+    st.title("🔁 Review")
+    user = st.session_state["username"]
+    try:
+        deck = review_store.deck(user)
+    except Exception as e:
+        st.error(f"Could not load your review cards: {e}")
+        return
+
+    queue = st.session_state.get("review_queue")
+    if not queue:
+        queue = st.session_state["review_queue"] = deck.due(SESSION_CARDS)
+        st.session_state["review_revealed"] = False
+
+    if not queue:
+        try:
+            review_store.flush(user)
+        except Exception as e:
+            st.warning(f"Reviews could not be saved yet: {e}")
+        st.success("🎉 No cards are due. Generate flashcards or take a quiz to add more.")
+        next_due = deck.next_due()
+        if next_due is not None:
+            st.caption(f"Next card due {datetime.fromtimestamp(next_due):%Y-%m-%d %H:%M}")
+        return
+
+    card = deck.cards[queue[0]]
+    st.caption(f"{len(queue)} cards left in this session · {len(deck.cards)} cards in your deck")
+    st.markdown(f"**{card['front']}**")
+
+    if not st.session_state["review_revealed"]:
+        if st.button("Show answer"):
+            st.session_state["review_revealed"] = True
+            st.rerun()
+        return
+
+    st.markdown(card["back"])
+    for column, (label, quality) in zip(st.columns(len(GRADES)), GRADES.items()):
+        if column.button(label):
+            deck.review(card["card_id"], quality)
+            queue.pop(0)
+            st.session_state["review_revealed"] = False
+            if deck.dirty_count() >= FLUSH_BATCH:
+                try:
+                    review_store.flush(user)
+                except Exception as e:
+                    st.warning(f"Reviews could not be saved yet: {e}")
+            st.rerun()
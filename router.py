@@ -0,0 +1,104 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from gemini import get_model
+from gen_cache import model_name
+from scheduler import generate_content as scheduled_generate_content, scheduler
+from telemetry import latencies, metrics
+
+FAST_MODEL = os.environ.get("GEMINI_FAST_MODEL", "gemini-1.5-flash")
+STRONG_MODEL = os.environ.get("GEMINI_STRONG_MODEL", "gemini-1.5-pro")
+
+# Preferred model per task and the rolling p90 latency (s) beyond which the fast model takes over.
+# Size and latency only ever downgrade, so they apply to tasks that prefer the strong model.
+TASKS = {
+    "chat": (FAST_MODEL, 10.0),
+    "summary": (FAST_MODEL, 10.0),
+    "quiz": (STRONG_MODEL, 20.0),
+    "flashcards": (FAST_MODEL, 20.0),
+    "notes": (STRONG_MODEL, 30.0),
+}
+
+# Inputs plus requested output larger than this (in characters) always go to the fast model
+STRONG_MAX_CHARS = int(os.environ.get("ROUTER_STRONG_MAX_CHARS", "400000"))
+REQUEST_TIMEOUT = float(os.environ.get("GEMINI_REQUEST_TIMEOUT", "120"))
+HEDGE_PERCENTILE = float(os.environ.get("ROUTER_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("ROUTER_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.environ.get("ROUTER_HEDGE_MIN_DELAY", "1.0"))  # Never hedge requests faster than this
+ROUTER_WORKERS = int(os.environ.get("ROUTER_WORKERS", "16"))
+
+_pool = None
+
+
+def get_router_pool():
+    """Returns the thread pool hedged requests run on, creating it on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=ROUTER_WORKERS, thread_name_prefix="router")
+    return _pool
+
+
+def choose_model(task, input_chars=0, output_chars=0):
+    """Returns the model for a task, given its input and expected output size and recent latency."""
+    preferred, budget = TASKS[task]
+    if preferred == FAST_MODEL:
+        return get_model(FAST_MODEL)
+
+    if input_chars + output_chars > STRONG_MAX_CHARS:
+        metrics.inc("router_downgrades_total", task=task, reason="size")
+        return get_model(FAST_MODEL)
+
+    model = get_model(preferred)
+    p90 = latencies.percentile(model_name(model), 0.9, HEDGE_MIN_SAMPLES)
+    if p90 is not None and p90 > budget:
+        metrics.inc("router_downgrades_total", task=task, reason="latency")
+        return get_model(FAST_MODEL)
+    return model
+
+
+def generate_content(model, prompt, timeout=REQUEST_TIMEOUT, hedge=True, **kwargs):
+    """Calls `model.generate_content` through the scheduler with a timeout and optional hedging.
+
+    If the request is still running past the model's recent HEDGE_PERCENTILE
+    latency, a second request goes to the fast model and whichever finishes
+    first wins. Streaming requests are passed straight through.
+    """
+    if timeout:
+        kwargs.setdefault("request_options", {"timeout": timeout})
+    # Also bounds the scheduler's retries, so nothing keeps running once the caller has given up
+    deadline = time.monotonic() + timeout if timeout else None
+    if kwargs.get("stream"):
+        return scheduled_generate_content(model, prompt, deadline=deadline, **kwargs)
+
+    pool = get_router_pool()
+    pending = {pool.submit(scheduled_generate_content, model, prompt, deadline=deadline, **kwargs)}
+
+    hedge_after = latencies.percentile(model_name(model), HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES) if hedge else None
+    if hedge_after is not None:
+        hedge_after = max(hedge_after, HEDGE_MIN_DELAY)
+    if hedge_after is not None and (not timeout or hedge_after < timeout):
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done:
+            fast = get_model(FAST_MODEL)
+            metrics.inc("router_hedges_total", model=model_name(model))
+            # Not coalesced with the first request, even when both go to the same model
+            pending.add(pool.submit(scheduler.run, lambda: fast.generate_content(prompt, **kwargs),
+                                    name=model_name(fast), deadline=deadline))
+
+    # First success wins; a request that fails early doesn't end the race for one still running
+    error = None
+    while pending:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+    if not pending and error is not None:
+        raise error
+    metrics.inc("router_timeouts_total", model=model_name(model))
+    raise TimeoutError(f"{model_name(model)} did not respond within {timeout:g}s")
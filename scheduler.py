@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from gen_cache import model_name
+from telemetry import metrics, record_model_call
+
+RATE_PER_SECOND = float(os.environ.get("GEMINI_RATE_PER_SECOND", "5"))
+BURST = int(os.environ.get("GEMINI_BURST", "10"))
+MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+BASE_DELAY = float(os.environ.get("GEMINI_RETRY_BASE_DELAY", "1.0"))
+MAX_DELAY = float(os.environ.get("GEMINI_RETRY_MAX_DELAY", "30.0"))
+
+# google.api_core exception names worth retrying; matched by name so the SDK isn't imported here
+RETRYABLE_ERRORS = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "DeadlineExceeded",
+    "InternalServerError",
+}
+
+
+def is_retryable(error):
+    """Returns True for rate-limit, timeout and transient server errors."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often requests may start."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """Process-wide gate for model calls: rate limiting, bounded concurrency,
+    retries with exponential backoff and single-flight coalescing."""
+
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST, max_concurrency=MAX_CONCURRENCY,
+                 max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _acquire_slot(self, deadline):
+        if deadline is None:
+            return self.slots.acquire()
+        remaining = deadline - time.monotonic()
+        return remaining > 0 and self.slots.acquire(timeout=remaining)
+
+    def _execute(self, call, name, deadline=None):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            if not self._acquire_slot(deadline):
+                metrics.inc("model_deadline_exceeded_total", model=name)
+                raise TimeoutError(f"{name} request not started before its deadline")
+            try:
+                start = time.perf_counter()
+                response = call()
+                record_model_call(name, time.perf_counter() - start, response)
+                return response
+            except Exception as e:
+                record_model_call(name, time.perf_counter() - start, error=e)
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                # The caller has given up by the deadline, so a retry after it would only hold a slot
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if attempt == self.max_retries or not is_retryable(e) or out_of_time:
+                    raise
+                metrics.inc("model_retries_total", model=name)
+            finally:
+                self.slots.release()
+            # Full jitter keeps a burst of retries from arriving in lockstep
+            time.sleep(delay)
+
+    def run(self, call, key=None, name="unknown", deadline=None):
+        """Runs `call()` through the scheduler; `name` labels its metrics.
+
+        Concurrent calls sharing a `key` are coalesced: only the first one hits
+        the API and the others wait for and share its result. `deadline` is a
+        `time.monotonic()` time after which no attempt or retry is started and
+        waiting callers give up with TimeoutError.
+        """
+        if key is None:
+            return self._execute(call, name, deadline)
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+
+        if not leader:
+            metrics.inc("model_requests_coalesced_total", model=name)
+            return future.result(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+
+        try:
+            future.set_result(self._execute(call, name, deadline))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+        return future.result()
+
+
+scheduler = RequestScheduler()
+
+
+def call_name(model, **kwargs):
+    """Labels a call's metrics; streamed calls only time the first chunk, so they are kept apart."""
+    return model_name(model) + (":stream" if kwargs.get("stream") else "")
+
+
+def request_key(model, prompt, **kwargs):
+    """Identifies a generate_content request for coalescing."""
+    payload = json.dumps([model_name(model), prompt, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def generate_content(model, prompt, deadline=None, **kwargs):
+    """Calls `model.generate_content` through the shared scheduler, retrying until `deadline`."""
+    key = None if kwargs.get("stream") else request_key(model, prompt, **kwargs)
+    return scheduler.run(lambda: model.generate_content(prompt, **kwargs), key=key, name=call_name(model, **kwargs),
+                         deadline=deadline)
+
+
+def send_message(chat, message, deadline=None, **kwargs):
+    """Calls `chat.send_message` through the shared scheduler, retrying until `deadline`.
+
+    Chat sessions are stateful, so these requests are never coalesced.
+    """
+    return scheduler.run(lambda: chat.send_message(message, **kwargs),
+                         name=call_name(getattr(chat, "model", chat), **kwargs), deadline=deadline)
@@ -0,0 +1,169 @@
+import math
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from retrieval import tokenize
+from telemetry import metrics
+
+THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.75"))
+DIMENSIONS = int(os.environ.get("SEMANTIC_CACHE_DIMENSIONS", "4096"))
+MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+MAX_PER_DOCUMENT = int(os.environ.get("SEMANTIC_CACHE_MAX_PER_DOCUMENT", "200"))
+TTL_SECONDS = int(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from how i in is it me my of on or please "
+    "s so tell that the this to was what whats when where which who why will with would you "
+    "define describe explain mean meaning meant".split()
+)
+
+# What a question asks for; "define X" asks the same thing as "what is X"
+QUESTION_WORDS = {
+    "who": "who", "whom": "who", "whose": "who",
+    "what": "what", "whats": "what", "define": "what", "describe": "what", "explain": "what",
+    "mean": "what", "meaning": "what", "meant": "what",
+    "when": "when", "where": "where", "why": "why", "which": "which", "how": "how",
+}
+
+# Follow-ups like "explain that again" depend on the conversation, not just the document
+REFERENTIAL = frozenset("it its this that these those they them he she above previous again more else".split())
+
+# Words that change the answer however similar they look; never stemmed and never stopwords
+EXACT_WORDS = frozenset(
+    "no not never none nor neither without cannot isn aren doesn don didn wasn weren won wouldn shouldn "
+    "couldn hasn haven first second third fourth fifth sixth seventh eighth ninth tenth last".split()
+)
+
+# Inflectional endings, longest first; "mitochondria" and "mitochondrion" share a stem
+SUFFIXES = ("ions", "ion", "ies", "ing", "ed", "es", "ia", "on", "um", "a", "s", "e")
+MIN_STEM = 4
+
+
+def stem(term):
+    """Strips one inflectional ending from a word; numbers and EXACT_WORDS are kept as they are."""
+    if term in EXACT_WORDS or not term.isalpha():
+        return term
+    for suffix in SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= MIN_STEM:
+            return term[:-len(suffix)]
+    return term
+
+
+def question_terms(question):
+    """Returns the stemmed content words of a question, or an empty list for a conversational follow-up."""
+    tokens = tokenize(question)
+    if any(token in REFERENTIAL for token in tokens):
+        return []
+    return [stem(token) for token in tokens if token not in STOPWORDS]
+
+
+def question_intent(question):
+    """Returns what kind of answer a question asks for, from its first question word."""
+    for token in tokenize(question):
+        if token in QUESTION_WORDS:
+            return QUESTION_WORDS[token]
+    return None
+
+
+def vectorize(terms, dimensions=DIMENSIONS):
+    """Hashes words and their character trigrams into an L2-normalized sparse vector.
+
+    Each word outweighs all of its trigrams together, so one changed word moves the score a lot.
+    """
+    vector = {}
+    for term in terms:
+        features = [(term, 1.0)]
+        padded = f"#{term}#"
+        trigram_weight = 0.5 / (len(padded) - 2)
+        features.extend((padded[i:i + 3], trigram_weight) for i in range(len(padded) - 2))
+        for feature, weight in features:
+            # crc32 rather than hash(), which is salted per process
+            index = zlib.crc32(feature.encode("utf-8")) % dimensions
+            vector[index] = vector.get(index, 0.0) + weight
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+
+def cosine(a, b):
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+class SemanticCache:
+    """Per-document cache of chatbot answers, matched by question similarity.
+
+    Documents are evicted least recently used first; within a document the
+    least recently served answer goes once MAX_PER_DOCUMENT is reached.
+    """
+
+    def __init__(self, threshold=THRESHOLD, max_entries=MAX_ENTRIES,
+                 max_per_document=MAX_PER_DOCUMENT, ttl=TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_per_document = max_per_document
+        self.ttl = ttl
+        self._documents = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, document_key, question):
+        """Returns (cached question, answer) for the closest match above the threshold, or None."""
+        terms = question_terms(question)
+        if not terms:
+            return None
+        vector = vectorize(terms)
+        words = frozenset(terms)
+        intent = question_intent(question)
+        now = time.time()
+
+        with self._lock:
+            entries = self._documents.get(document_key)
+            best, best_score = None, self.threshold
+            for entry in entries or ():
+                # "Why do cells divide?" and "How do cells divide?" share every content word, and
+                # "type 1 diabetes" and "type 2 diabetes" differ by one; both need different answers
+                if now - entry["created"] > self.ttl or entry["intent"] != intent or entry["words"] != words:
+                    continue
+                score = cosine(vector, entry["vector"])
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                metrics.inc("semantic_cache_requests_total", result="miss")
+                return None
+            self._documents.move_to_end(document_key)
+            best["used"] = now
+
+        metrics.inc("semantic_cache_requests_total", result="hit")
+        return best["question"], best["answer"]
+
+    def store(self, document_key, question, answer):
+        """Caches an answer for a question about a document."""
+        terms = question_terms(question)
+        if not terms or not answer:
+            return
+        now = time.time()
+        entry = {"vector": vectorize(terms), "words": frozenset(terms),
+                 "intent": question_intent(question), "question": question, "answer": answer, "created": now, "used": now}
+
+        with self._lock:
+            entries = self._documents.setdefault(document_key, [])
+            self._documents.move_to_end(document_key)
+            live = [cached for cached in entries if now - cached["created"] <= self.ttl]
+            self._size -= len(entries) - len(live)
+            entries[:] = live
+            entries.append(entry)
+            self._size += 1
+            if len(entries) > self.max_per_document:
+                entries.remove(min(entries, key=lambda cached: cached["used"]))
+                self._size -= 1
+            while self._size > self.max_entries:
+                _, evicted = self._documents.popitem(last=False)
+                self._size -= len(evicted)
+
+
+semantic_cache = SemanticCache()
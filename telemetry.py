@@ -0,0 +1,226 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_LOG = os.environ.get("TRACE_LOG")  # JSON-lines file for spans; unset logs to the "trace" logger only
+METRICS_FILE = os.environ.get("METRICS_FILE")  # Prometheus text file, rewritten at most every METRICS_FILE_INTERVAL
+METRICS_FILE_INTERVAL = float(os.environ.get("METRICS_FILE_INTERVAL", "10"))
+METRICS_PORT = os.environ.get("METRICS_PORT")  # Serve /metrics on this port when set
+
+LATENCY_WINDOW = int(os.environ.get("LATENCY_WINDOW", "200"))  # Recent model calls kept per model for percentiles
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger("trace")
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.setdefault(key, [[0] * len(LATENCY_BUCKETS), 0, 0.0])
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{fmt(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), (buckets, count, total) in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_count{fmt(labels)} {count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class LatencyWindow:
+    """Rolling window of recent successful request latencies per model."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self.size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.size)).append(seconds)
+
+    def percentile(self, name, q, min_samples=1):
+        """Returns the q-th quantile (0-1) of recent latencies, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latencies = LatencyWindow()
+
+_trace_file_lock = threading.Lock()
+_metrics_file_lock = threading.Lock()
+_metrics_written = 0.0
+
+
+def _emit(record):
+    line = json.dumps(record, default=str)
+    logger.debug(line)
+    if TRACE_LOG:
+        try:
+            with _trace_file_lock, open(TRACE_LOG, "a", encoding="utf-8") as trace_file:
+                trace_file.write(line + "\n")
+        except OSError:
+            pass  # Tracing is best-effort; it must never fail the request being traced
+
+
+def write_metrics_file(force=False):
+    """Rewrites METRICS_FILE with the current metrics, throttled to METRICS_FILE_INTERVAL."""
+    global _metrics_written
+    if not METRICS_FILE:
+        return
+    with _metrics_file_lock:
+        now = time.monotonic()
+        if not force and now - _metrics_written < METRICS_FILE_INTERVAL:
+            return
+        _metrics_written = now
+        # Unique per writer, like text_cache entries, so no writer can replace another's temp file
+        tmp_path = f"{METRICS_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(metrics.render())
+            os.replace(tmp_path, METRICS_FILE)
+        except OSError:
+            pass  # The file is refreshed on a later span; /metrics is unaffected
+
+
+@contextmanager
+def span(name, **attributes):
+    """Times a stage of a rerun, records it in the stage histogram and logs it as JSON.
+
+    Spans nest: a span opened inside another shares its trace id.
+    """
+    parent = _current_span.get()
+    record = {
+        "trace": parent["trace"] if parent else uuid.uuid4().hex[:16],
+        "span": uuid.uuid4().hex[:16],
+        "parent": parent["span"] if parent else None,
+        "name": name,
+        **attributes,
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield record
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_span.reset(token)
+        record["status"] = status
+        record["ms"] = round(elapsed * 1000, 3)
+        metrics.observe("stage_duration_seconds", elapsed, stage=name)
+        if status == "error":
+            metrics.inc("stage_errors_total", stage=name)
+        _emit(record)
+        write_metrics_file()
+
+
+def traced(name):
+    """Decorator form of `span`."""
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
+
+
+def record_model_call(model_name, seconds, response=None, error=None):
+    """Counts a model request with its latency and, when reported, its token usage."""
+    status = "error" if error is not None else "ok"
+    metrics.inc("model_requests_total", model=model_name, status=status)
+    metrics.observe("model_request_duration_seconds", seconds, model=model_name)
+    if error is None:
+        latencies.record(model_name, seconds)
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        metrics.inc("model_prompt_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, model=model_name)
+        metrics.inc("model_output_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, model=model_name)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would otherwise flood stderr
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serves /metrics on `port` from a daemon thread; does nothing if no port is configured."""
+    global _server
+    if not port:
+        return
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
@@ -0,0 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_store import next_seq
+
+
+def test_next_seq_is_unique_and_increasing_across_threads():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        seqs = list(pool.map(lambda _: next_seq(), range(2000)))
+
+    assert len(set(seqs)) == len(seqs)
+    assert next_seq() > max(seqs)
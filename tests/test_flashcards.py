@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+import flashcards
+from mapreduce import MAX_SECTIONS
+
+
+def test_map_reduce_makes_one_call_per_section(monkeypatch):
+    prompts = []
+
+    def generate_content(model, prompt):
+        prompts.append(prompt)
+        return SimpleNamespace(text=f"Question {len(prompts)}?\nAnswer {len(prompts)}.")
+
+    monkeypatch.setattr(flashcards, "generate_content", generate_content)
+    monkeypatch.setattr(flashcards.generation_cache, "get_or_generate",
+                        lambda model, template, text, params, generate, refresh=False: generate())
+
+    deck = flashcards.generate_flashcards(None, " ".join(f"word{i}" for i in range(200000)))
+
+    assert len(prompts) == MAX_SECTIONS
+    assert len(flashcards.parse_flashcards(deck)) == MAX_SECTIONS
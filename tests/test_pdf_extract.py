@@ -0,0 +1,25 @@
+import pytest
+
+import pdf_extract
+from pdf_extract import extract_text_checked
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Registers a backend whose "PDF" is a list of page texts."""
+    monkeypatch.setitem(pdf_extract.BACKENDS, "list", lambda pdf, start, stop: iter(pdf[start:stop]))
+    monkeypatch.setitem(pdf_extract.SEPARATORS, "list", "\n")
+
+
+def test_whole_document_is_not_truncated(pages):
+    assert extract_text_checked(["one", "two"], "list", max_pages=2, max_bytes=7) == ("one\ntwo", False)
+
+
+def test_page_limit_reports_truncation(pages):
+    assert extract_text_checked(["one", "two", "three"], "list", max_pages=2) == ("one\ntwo", True)
+
+
+def test_byte_limit_reports_truncation(pages):
+    assert extract_text_checked(["one", "two"], "list", max_bytes=5) == ("one\ntw", True)
+    assert extract_text_checked(["one", "two"], "list", max_bytes=6) == ("one\ntwo", False)
+    assert extract_text_checked(["one", "two", "x"], "list", max_bytes=6) == ("one\ntwo", True)
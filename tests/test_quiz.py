@@ -0,0 +1,30 @@
+from quiz import correct_label, correct_option, quiz_cards
+
+QUESTION = {
+    "question": "What do mitochondria generate?",
+    "options": ["Proteins", "Chemical energy", "DNA", "Lipids"],
+    "correct_answer": "B",
+}
+
+
+def test_correct_option_maps_letter_to_text():
+    assert correct_option(QUESTION) == "Chemical energy"
+    assert correct_option(dict(QUESTION, correct_answer="d)")) == "Lipids"
+
+
+def test_correct_option_falls_back_to_raw_answer():
+    assert correct_option(dict(QUESTION, correct_answer="Z")) == "Z"
+
+
+def test_quiz_cards_label_options_and_grade_answers():
+    cards, outcomes = quiz_cards([QUESTION, QUESTION, QUESTION], ["Chemical energy", "DNA", None])
+
+    front, back = cards[0]
+    assert front == "What do mitochondria generate?\n\nA) Proteins\nB) Chemical energy\nC) DNA\nD) Lipids"
+    assert back == "B) Chemical energy"
+    assert outcomes == [5, 1, None]
+
+
+def test_correct_label_shows_letter_and_option():
+    assert correct_label(QUESTION) == "B) Chemical energy"
+    assert correct_label(dict(QUESTION, correct_answer="Z")) == "Z"
@@ -0,0 +1,63 @@
+from review import DAY, DEFAULT_EASE, EASY_FIRST_INTERVAL, MIN_EASE, ReviewDeck, sm2
+
+
+def new_card():
+    return {"card_id": "c", "ease": DEFAULT_EASE, "interval": 0, "repetitions": 0, "due": 0}
+
+
+def test_sm2_intervals_grow_on_correct_reviews():
+    card = new_card()
+    sm2(card, 4, now=0)
+    assert card["interval"] == 1 and card["due"] == DAY
+    sm2(card, 4, now=0)
+    assert card["interval"] == 6
+    sm2(card, 4, now=0)
+    assert card["interval"] == round(6 * card["ease"])
+
+
+def test_sm2_easy_first_review_waits_longer_than_a_lapse():
+    easy, lapse = new_card(), new_card()
+    sm2(easy, 5, now=0)
+    sm2(lapse, 1, now=0)
+    assert easy["due"] == EASY_FIRST_INTERVAL * DAY
+    assert lapse["due"] == DAY
+    assert lapse["ease"] < DEFAULT_EASE < easy["ease"]
+
+
+def test_sm2_lapse_resets_repetitions_and_floors_ease():
+    card = new_card()
+    for _ in range(3):
+        sm2(card, 5, now=0)
+    for _ in range(10):
+        sm2(card, 0, now=0)
+    assert card["repetitions"] == 0
+    assert card["interval"] == 1
+    assert card["ease"] == MIN_EASE
+
+
+def test_deck_returns_due_cards_soonest_first():
+    deck = ReviewDeck()
+    ids = [deck.add("flashcard", f"q{i}", "a", now=i) for i in range(10)]
+    assert deck.due(3, now=100) == ids[:3]
+    assert deck.due(100, now=4) == ids[:5]
+
+
+def test_deck_skips_rescheduled_cards_and_keeps_state_on_readd():
+    deck = ReviewDeck()
+    first = deck.add("flashcard", "q0", "a", now=0)
+    second = deck.add("flashcard", "q1", "a", now=1)
+    deck.review(first, 4, now=10)
+
+    assert deck.due(10, now=100) == [second]
+    assert deck.next_due() == 1
+    assert deck.add("flashcard", "q0", "a", now=50) == first
+    assert deck.cards[first]["repetitions"] == 1
+
+
+def test_deck_tracks_changes_until_taken():
+    deck = ReviewDeck()
+    cid = deck.add("quiz", "q", "a", now=0)
+    assert [row["card_id"] for row in deck.take_dirty()] == [cid]
+    assert deck.take_dirty() == []
+    deck.review(cid, 3, now=0)
+    assert deck.dirty_count() == 1
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+import router
+
+
+class Model:
+    def __init__(self, name, seconds, result=None, error=None):
+        self.model_name = name
+        self.seconds = seconds
+        self.result = result or name
+        self.error = error
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    """Routes hedges to a fast model and hedges any request still running after 50 ms."""
+    model = Model(router.FAST_MODEL, 0.05)
+    monkeypatch.setattr(router, "get_model", lambda name: model)
+    monkeypatch.setattr(router, "HEDGE_MIN_DELAY", 0)
+    monkeypatch.setattr(router.latencies, "percentile", lambda name, q, min_samples: 0.05)
+    return model
+
+
+def test_slow_request_is_hedged_to_the_fast_model(fast):
+    start = time.monotonic()
+    assert router.generate_content(Model("slow", 1.0), "prompt", timeout=5) == router.FAST_MODEL
+    assert time.monotonic() - start < 0.5
+    assert fast.calls == 1
+
+
+def test_early_failure_does_not_end_the_race(fast):
+    failing = Model("failing", 0.1, error=ValueError("boom"))
+    fast.seconds = 0.2
+    assert router.generate_content(failing, "prompt", timeout=5) == router.FAST_MODEL
+
+
+def test_error_is_raised_when_every_request_fails(fast):
+    fast.error = ValueError("fast failed")
+    with pytest.raises(ValueError):
+        router.generate_content(Model("failing", 0.1, error=ValueError("slow failed")), "prompt", timeout=5)
+
+
+def test_timeout_ends_the_wait_and_its_retries(monkeypatch):
+    monkeypatch.setattr(router.latencies, "percentile", lambda name, q, min_samples: None)  # No hedge
+    monkeypatch.setattr(router.scheduler, "base_delay", 0.01)
+    slow = Model("hung", 0.3, error=TimeoutError("request timed out"))
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        router.generate_content(slow, "prompt", timeout=0.2)
+    assert time.monotonic() - start < 0.3
+
+    time.sleep(0.5)
+    assert slow.calls == 1  # The scheduler did not retry past the caller's deadline
+
+
+def test_quiz_is_routed_by_size_and_latency(monkeypatch):
+    monkeypatch.setattr(router, "get_model", lambda name: Model(name, 0))
+    monkeypatch.setattr(router.latencies, "percentile", lambda name, q, min_samples: 5.0)
+    assert router.choose_model("quiz", 1000).model_name == router.STRONG_MODEL
+    assert router.choose_model("quiz", router.STRONG_MAX_CHARS + 1).model_name == router.FAST_MODEL
+
+    monkeypatch.setattr(router.latencies, "percentile", lambda name, q, min_samples: 60.0)
+    assert router.choose_model("quiz", 1000).model_name == router.FAST_MODEL
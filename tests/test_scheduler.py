@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import RequestScheduler
+
+
+class ServiceUnavailable(Exception):
+    """Stands in for google.api_core's retryable error, which is matched by name."""
+
+
+def make_scheduler(**kwargs):
+    return RequestScheduler(rate=1000, burst=1000, **kwargs)
+
+
+def failing(times, result="ok", error=ServiceUnavailable):
+    calls = []
+
+    def call():
+        calls.append(time.monotonic())
+        if len(calls) <= times:
+            raise error("try again")
+        return result
+    return call, calls
+
+
+def test_concurrent_calls_with_one_key_are_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    scheduler = make_scheduler()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(scheduler.run, call, key="same") for _ in range(4)]
+        while not scheduler._in_flight:
+            time.sleep(0.01)
+        time.sleep(0.1)  # Let the followers find the leader's request
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert not scheduler._in_flight
+
+
+def test_retryable_errors_back_off_exponentially(monkeypatch):
+    delays = []
+    monkeypatch.setattr(scheduler_module.time, "sleep", delays.append)
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    call, calls = failing(3)
+
+    assert make_scheduler(base_delay=1.0, max_delay=3.0).run(call) == "ok"
+    assert len(calls) == 4
+    assert delays == [1.0, 2.0, 3.0]
+
+
+def test_other_errors_are_not_retried():
+    call, calls = failing(1, error=ValueError)
+    with pytest.raises(ValueError):
+        make_scheduler().run(call)
+    assert len(calls) == 1
+
+
+def test_retries_stop_at_the_deadline():
+    call, calls = failing(100)
+    start = time.monotonic()
+    with pytest.raises(ServiceUnavailable):
+        make_scheduler(max_retries=100, base_delay=0.05, max_delay=0.05).run(call, deadline=start + 0.3)
+
+    assert time.monotonic() - start < 0.4
+    assert calls[-1] < start + 0.3
+    assert len(calls) < 100
+
+
+def test_requests_waiting_for_a_slot_give_up_at_the_deadline():
+    scheduler = make_scheduler(max_concurrency=1)
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        busy = pool.submit(scheduler.run, lambda: release.wait(5))
+        time.sleep(0.05)
+        call, calls = failing(0)
+        with pytest.raises(TimeoutError):
+            scheduler.run(call, deadline=time.monotonic() + 0.1)
+        release.set()
+        busy.result()
+    assert calls == []
+
+
+def test_coalesced_followers_give_up_at_their_deadline():
+    scheduler = make_scheduler()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(scheduler.run, lambda: release.wait(5) and "late", key="same")
+        while not scheduler._in_flight:
+            time.sleep(0.01)
+        with pytest.raises(TimeoutError):
+            scheduler.run(lambda: "unused", key="same", deadline=time.monotonic() + 0.1)
+        release.set()
+        assert leader.result() == "late"
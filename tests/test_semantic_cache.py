@@ -0,0 +1,54 @@
+import pytest
+
+from semantic_cache import SemanticCache, question_intent, stem
+
+
+def cache_with(question, answer="cached"):
+    cache = SemanticCache()
+    cache.store("doc", question, answer)
+    return cache
+
+
+def test_near_identical_question_hits():
+    cache = cache_with("What is a mitochondrion?")
+    assert cache.lookup("doc", "what are mitochondria") == ("What is a mitochondrion?", "cached")
+    assert cache.lookup("doc", "Define mitochondrion.") is not None
+
+
+def test_different_question_words_do_not_share_answers():
+    assert cache_with("Why do cells divide?").lookup("doc", "How do cells divide?") is None
+    assert cache_with("Who discovered penicillin?").lookup("doc", "When was penicillin discovered?") is None
+
+
+def test_answers_are_scoped_to_the_document():
+    assert cache_with("What is a mitochondrion?").lookup("other", "What is a mitochondrion?") is None
+
+
+def test_follow_ups_are_never_cached():
+    cache = cache_with("Explain that again")
+    assert cache.lookup("doc", "Explain that again") is None
+
+
+def test_question_intent():
+    assert question_intent("Define osmosis") == "what"
+    assert question_intent("How does osmosis work?") == "how"
+    assert question_intent("Osmosis?") is None
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("What is type 1 diabetes?", "What is type 2 diabetes?"),
+    ("What is hyperthyroidism?", "What is hypothyroidism?"),
+    ("What is the nucleus?", "What is the nucleolus?"),
+    ("What is the first law?", "What is the second law of thermodynamics?"),
+    ("What happened in 1914?", "What happened in 1918?"),
+    ("What is a mammal?", "What is not a mammal?"),
+])
+def test_questions_differing_by_one_key_word_miss(stored, asked):
+    assert cache_with(stored).lookup("doc", asked) is None
+    assert cache_with(asked).lookup("doc", stored) is None
+
+
+def test_inflections_share_a_stem():
+    assert stem("mitochondria") == stem("mitochondrion")
+    assert stem("divides") == stem("divide") == stem("dividing")
+    assert stem("1914") == "1914" and stem("second") == "second"
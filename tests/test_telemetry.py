@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+from telemetry import span
+
+
+def test_concurrent_spans_rewrite_the_metrics_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "METRICS_FILE", str(tmp_path / "metrics.prom"))
+    monkeypatch.setattr(telemetry, "METRICS_FILE_INTERVAL", 0)
+
+    def work(_):
+        for _ in range(50):
+            with span("stress"):
+                pass
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(8)))  # Re-raises any error from a worker
+
+    assert "stage_duration_seconds" in (tmp_path / "metrics.prom").read_text()
+    assert [path.name for path in tmp_path.iterdir()] == ["metrics.prom"]
+
+
+def test_unwritable_telemetry_files_do_not_fail_the_span(tmp_path, monkeypatch):
+    monkeypatch.setattr(telemetry, "METRICS_FILE", str(tmp_path / "missing" / "metrics.prom"))
+    monkeypatch.setattr(telemetry, "TRACE_LOG", str(tmp_path / "missing" / "trace.jsonl"))
+    monkeypatch.setattr(telemetry, "METRICS_FILE_INTERVAL", 0)
+
+    with span("unwritable"):
+        pass
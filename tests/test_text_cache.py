@@ -0,0 +1,32 @@
+import os
+
+from text_cache import TextCache
+
+
+def test_memory_tier_is_bounded_in_bytes(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=100)
+    for i in range(5):
+        cache.put(f"doc{i}", "pymupdf", str(i) * 40)
+
+    assert cache._memory_size <= 100
+    assert len(cache._memory) == 2
+    assert cache.get("doc0", "pymupdf") == "0" * 40  # Evicted from memory, still on disk
+
+
+def test_oversized_text_is_served_from_disk(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=10)
+    cache.put("big", "pymupdf", "x" * 50)
+    assert not cache._memory
+    assert cache.get("big", "pymupdf") == "x" * 50
+
+
+def test_disk_tier_drops_least_recently_used_files(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=0, disk_bytes=250)
+    for i in range(3):
+        cache.put(f"doc{i}", "pymupdf", "x" * 100)
+        path = cache._path(cache._key(f"doc{i}", "pymupdf"))
+        os.utime(path, (i, i))  # Distinct ages regardless of filesystem timestamp resolution
+
+    assert cache.get("doc0", "pymupdf") is None
+    assert cache.get("doc2", "pymupdf") == "x" * 100
+    assert sum(os.path.getsize(path) for _, _, path in cache._disk_files()) <= 250
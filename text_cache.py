@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Bump when extraction output changes so stale entries are never served.
+EXTRACTOR_VERSION = "3"
+
+CACHE_DIR = os.environ.get("TEXT_CACHE_DIR", os.path.join(".cache", "extracted-text"))
+# Decoded text kept in memory; sized in characters, which is bytes for the mostly-ASCII text of PDFs
+MEMORY_BYTES = int(os.environ.get("TEXT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+# Size of the on-disk tier; past this, the least recently used files are deleted
+DISK_BYTES = int(os.environ.get("TEXT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+
+def content_hash(data):
+    """Returns the SHA-256 hex digest of the given file bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class TextCache:
+    """Two-tier (in-memory LRU + on-disk) cache of extracted document text, each tier bounded in bytes."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None  # Measured on the first write
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+
+    def _key(self, digest, extractor):
+        return f"{digest}-{extractor}-v{EXTRACTOR_VERSION}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _remember(self, key, text):
+        if len(text) > self.max_bytes:
+            return  # Served from disk instead of pushing everything else out
+        with self._lock:
+            if key in self._memory:
+                self._memory_size -= len(self._memory[key])
+            self._memory[key] = text
+            self._memory_size += len(text)
+            self._memory.move_to_end(key)
+            while self._memory_size > self.max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def get(self, digest, extractor):
+        """Returns cached text for a content hash, or None on a miss."""
+        key = self._key(digest, extractor)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as cached_file:
+                text = cached_file.read()
+            os.utime(path)  # Recently read files are the last to be pruned
+        except OSError:
+            return None
+
+        self._remember(key, text)
+        return text
+
+    def put(self, digest, extractor, text):
+        """Stores extracted text in both tiers."""
+        key = self._key(digest, extractor)
+        self._remember(key, text)
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so concurrent readers never see a partial entry
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as cached_file:
+                cached_file.write(text)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # The disk tier is best-effort; the memory tier still holds the entry
+        self._grow_disk(size)
+
+    def _disk_files(self):
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed by another process meanwhile
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _grow_disk(self, size):
+        with self._prune_lock:
+            if self._disk_size is None:
+                self._disk_size = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_size += size  # Overwrites are counted twice until the next prune corrects it
+            if self._disk_size <= self.disk_bytes:
+                return
+            # Scanning is only needed when over budget; prune to 90% so it doesn't rerun on every write
+            files = sorted(self._disk_files())
+            self._disk_size = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if self._disk_size <= self.disk_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._disk_size -= size
+
+    def get_or_extract(self, data, extractor, extract):
+        """Returns cached text for `data`, calling `extract(data)` on a miss."""
+        digest = content_hash(data)
+        text = self.get(digest, extractor)
+        if text is None:
+            text = extract(data)
+            self.put(digest, extractor, text)
+        return text
+
+
+text_cache = TextCache()
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import threading
+
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+READ_CHUNK_BYTES = int(os.environ.get("UPLOAD_READ_CHUNK_BYTES", str(1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an uploaded file exceeds MAX_UPLOAD_BYTES."""
+
+
+def read_upload(uploaded_file, max_bytes=MAX_UPLOAD_BYTES, chunk_size=READ_CHUNK_BYTES):
+    """Reads an uploaded file in chunks, hashing as it goes and enforcing the size limit.
+
+    Returns (data, sha256 hex digest).
+    """
+    uploaded_file.seek(0)
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    for chunk in iter(lambda: uploaded_file.read(chunk_size), b""):
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
+
+
+class UploadRegistry:
+    """Process-wide record of which content already sits at which storage path."""
+
+    def __init__(self):
+        self._uploaded = {}
+        self._lock = threading.Lock()
+
+    def is_uploaded(self, file_path, digest):
+        with self._lock:
+            return self._uploaded.get(file_path) == digest
+
+    def record(self, file_path, digest):
+        with self._lock:
+            self._uploaded[file_path] = digest
+
+    def forget(self, file_paths):
+        with self._lock:
+            for file_path in file_paths:
+                self._uploaded.pop(file_path, None)
+
+
+upload_registry = UploadRegistry()